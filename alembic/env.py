@@ -15,6 +15,7 @@ from users.models.models_v1 import User
 from projects.models.models_v1 import Project, Task
 from teams.models.models_v1 import Team
 from reports.models.models_v1 import UserReport, LLMReport
+from llm.models.models_v1 import LLMJob
 
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,47 @@
+"""persist llm analyses in llm_reports
+
+Revision ID: d7f3b9e0a6c2
+Revises: c4e8a1f2b3d9
+Create Date: 2026-10-18 09:48:03.917352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3b9e0a6c2'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1f2b3d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('llm_reports', sa.Column('kind', sa.String(length=50), nullable=True))
+    op.add_column('llm_reports', sa.Column('project_id', sa.UUID(), nullable=True))
+    op.add_column('llm_reports', sa.Column('task_id', sa.Integer(), nullable=True))
+    op.add_column('llm_reports', sa.Column('snapshot_hash', sa.String(length=64), nullable=True))
+    op.add_column('llm_reports', sa.Column('model', sa.String(length=255), nullable=True))
+    op.add_column('llm_reports', sa.Column('latency_ms', sa.Float(), nullable=True))
+    op.add_column('llm_reports', sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.create_foreign_key('llm_reports_project_id_fkey', 'llm_reports', 'projects', ['project_id'], ['id'])
+    op.create_foreign_key('llm_reports_task_id_fkey', 'llm_reports', 'tasks', ['task_id'], ['id'], ondelete='SET NULL')
+    op.create_index(op.f('ix_llm_reports_snapshot_hash'), 'llm_reports', ['snapshot_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_llm_reports_snapshot_hash'), table_name='llm_reports')
+    op.drop_constraint('llm_reports_task_id_fkey', 'llm_reports', type_='foreignkey')
+    op.drop_constraint('llm_reports_project_id_fkey', 'llm_reports', type_='foreignkey')
+    op.drop_column('llm_reports', 'result')
+    op.drop_column('llm_reports', 'latency_ms')
+    op.drop_column('llm_reports', 'model')
+    op.drop_column('llm_reports', 'snapshot_hash')
+    op.drop_column('llm_reports', 'task_id')
+    op.drop_column('llm_reports', 'project_id')
+    op.drop_column('llm_reports', 'kind')
@@ -0,0 +1,246 @@
+"""
+Stand-in for Ollama so the LLM path can be measured without a GPU.
+
+Serves the OpenAI-compatible /v1/chat/completions endpoint (and native
+/api/chat) with configurable first-token latency, generation speed, error
+rate and malformed-JSON rate. Point OLLAMA_BASE_URL at it:
+
+    python -m bench.fake_ollama --port 11435 --first-token-ms 300 --tokens-per-sec 40
+    OLLAMA_BASE_URL=http://localhost:11435/v1/chat/completions uvicorn main:app
+
+GET /stats returns how many generations the server actually ran, which is
+what caching and coalescing changes should bring down.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from llm.services.prompt_compaction import estimate_tokens
+
+STATUSES = ["to_do", "in_progress", "review", "done"]
+
+
+class FakeOllamaConfig:
+    def __init__(
+            self,
+            first_token_ms: float = 300.0,
+            tokens_per_sec: float = 40.0,
+            error_rate: float = 0.0,
+            malformed_rate: float = 0.0,
+            parallel: int = 4,
+            seed: int | None = None
+    ):
+        self.first_token_ms = first_token_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        # like OLLAMA_NUM_PARALLEL: generations beyond this wait for a slot
+        self.parallel = parallel
+        self.random = random.Random(seed)
+
+
+class FakeOllamaStats:
+    def __init__(self):
+        self.requests = 0
+        self.completed = 0
+        self.errors = 0
+        self.malformed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queued = 0
+        self.started = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "completed": self.completed,
+            "errors": self.errors,
+            "malformed": self.malformed,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "uptime_seconds": round(time.monotonic() - self.started, 1)
+        }
+
+
+def create_app(config: FakeOllamaConfig) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    stats = FakeOllamaStats()
+    slots = asyncio.Semaphore(config.parallel)
+
+    def _analysis_text(messages: List[Dict[str, Any]]) -> str:
+        rng = config.random
+        if rng.random() < config.malformed_rate:
+            stats.malformed += 1
+            return '{"recommended_status": "in_progress", "confidence": 0.8, "reasoning": "cut off'
+
+        prompt = " ".join(message.get("content", "") for message in messages)
+        completion = rng.randint(0, 100)
+        analysis = {
+            "recommended_status": rng.choice(STATUSES),
+            "confidence": round(rng.uniform(0.5, 0.95), 2),
+            "reasoning": "Synthetic analysis from the benchmark stand-in server.",
+            "completion_percentage": completion
+        }
+        if "Project:" in prompt:
+            analysis["risk_level"] = rng.choice(["low", "medium", "high"])
+            analysis["recommendations"] = ["Review overdue tasks", "Unblock tasks in review"]
+        return json.dumps(analysis, indent=2)
+
+    def _pieces(text: str) -> List[str]:
+        # roughly one token per 4 characters, same ratio the app budgets with
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    async def _acquire_slot() -> None:
+        stats.queued += 1
+        try:
+            await slots.acquire()
+        finally:
+            stats.queued -= 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+
+    def _release_slot() -> None:
+        stats.in_flight -= 1
+        slots.release()
+
+    def _usage(messages: List[Dict[str, Any]], text: str) -> Dict[str, int]:
+        prompt_tokens = sum(estimate_tokens(message.get("content", "")) for message in messages)
+        completion_tokens = len(_pieces(text))
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    async def _generate(payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield pieces of the reply at the configured speed, holding a slot throughout"""
+        text = _analysis_text(payload.get("messages", []))
+        await _acquire_slot()
+        try:
+            await asyncio.sleep(config.first_token_ms / 1000)
+            delay = 1 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0
+            for i, piece in enumerate(_pieces(text)):
+                if i and delay:
+                    await asyncio.sleep(delay)
+                yield piece
+            stats.completed += 1
+        finally:
+            _release_slot()
+
+    def _should_fail() -> bool:
+        stats.requests += 1
+        if config.random.random() < config.error_rate:
+            stats.errors += 1
+            return True
+        return False
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        if _should_fail():
+            return JSONResponse(status_code=500, content={"error": "simulated backend failure"})
+
+        model = payload.get("model", "fake")
+        created = int(time.time())
+
+        if payload.get("stream"):
+            async def events() -> AsyncIterator[str]:
+                async for piece in _generate(payload):
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        text = "".join([piece async for piece in _generate(payload)])
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": _usage(payload.get("messages", []), text)
+        }
+
+    @app.post("/api/chat")
+    async def native_chat(request: Request):
+        payload = await request.json()
+        if _should_fail():
+            return JSONResponse(status_code=500, content={"error": "simulated backend failure"})
+
+        model = payload.get("model", "fake")
+
+        if payload.get("stream", True):
+            async def lines() -> AsyncIterator[str]:
+                async for piece in _generate(payload):
+                    yield json.dumps({"model": model, "message": {"role": "assistant", "content": piece}, "done": False}) + "\n"
+                yield json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        text = "".join([piece async for piece in _generate(payload)])
+        usage = _usage(payload.get("messages", []), text)
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": text},
+            "done": True,
+            "prompt_eval_count": usage["prompt_tokens"],
+            "eval_count": usage["completion_tokens"]
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.to_dict()
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        nonlocal stats
+        stats = FakeOllamaStats()
+        return stats.to_dict()
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Ollama server for LLM benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0, help="generation speed, 0 for instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of replies with truncated JSON")
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent generations, the rest queue")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        first_token_ms=args.first_token_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        parallel=args.parallel,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Load benchmark for the /api/mcp analysis routes.
+
+Drives one route at a fixed concurrency and reports throughput, latency
+percentiles and how many answers were fallbacks or served from cache.
+Run it against the app started with OLLAMA_BASE_URL pointing at
+bench/fake_ollama.py (or a real Ollama):
+
+    python -m bench.run_benchmark --email po@example.com --password secret \\
+        --route analyze-project --ids <uuid>,<uuid> --concurrency 16 --requests 400
+
+Cycling a few ids at high concurrency exercises caching and coalescing;
+many distinct ids exercise pooling and the backend itself.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ROUTES = {
+    "analyze-project": ("POST", "/api/mcp/analyze-project/{id}"),
+    "analyze-task": ("POST", "/api/mcp/analyze-task/{id}"),
+    "project-completion": ("GET", "/api/mcp/project-completion/{id}"),
+    "update-project-status": ("POST", "/api/mcp/update-project-status/{id}"),
+}
+
+
+class BenchmarkResult:
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.status_codes: Dict[int, int] = {}
+        self.errors = 0
+        self.fallbacks = 0
+        self.cached = 0
+        self.started = 0.0
+        self.finished = 0.0
+
+    def record(self, latency_ms: float, status_code: Optional[int], body: Any) -> None:
+        self.latencies_ms.append(latency_ms)
+        if status_code is None:
+            self.errors += 1
+            return
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        if status_code >= 400:
+            self.errors += 1
+            return
+        if isinstance(body, dict):
+            if body.get("fallback"):
+                self.fallbacks += 1
+            if body.get("cached"):
+                self.cached += 1
+
+    def summary(self) -> Dict[str, Any]:
+        total = len(self.latencies_ms)
+        elapsed = max(self.finished - self.started, 1e-9)
+        ok = total - self.errors
+        ordered = sorted(self.latencies_ms)
+        return {
+            "requests": total,
+            "errors": self.errors,
+            "status_codes": self.status_codes,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_rps": round(total / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(ordered, 50), 1),
+                "p95": round(percentile(ordered, 95), 1),
+                "p99": round(percentile(ordered, 99), 1),
+                "max": round(ordered[-1], 1) if ordered else 0.0,
+                "mean": round(sum(ordered) / total, 1) if total else 0.0
+            },
+            "fallback_rate": round(self.fallbacks / ok, 4) if ok else 0.0,
+            "cached_rate": round(self.cached / ok, 4) if ok else 0.0
+        }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def login_path(client: httpx.AsyncClient) -> str:
+    """Login route as the app mounts it, read from its OpenAPI route table so it cannot drift"""
+    response = await client.get("/openapi.json")
+    response.raise_for_status()
+    for path, operations in response.json()["paths"].items():
+        if path.rsplit("/", 1)[-1] == "login" and "post" in operations:
+            return path
+    raise RuntimeError("the app has no POST .../login route")
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post(await login_path(client), json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run(
+        base_url: str,
+        token: str,
+        route: str,
+        ids: List[str],
+        concurrency: int,
+        requests: int,
+        warmup: int,
+        timeout: float
+) -> BenchmarkResult:
+    method, path = ROUTES[route]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    result = BenchmarkResult()
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=timeout) as client:
+        async def call(i: int) -> tuple:
+            url = path.format(id=ids[i % len(ids)])
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url)
+            except httpx.HTTPError:
+                return (time.perf_counter() - started) * 1000, None, None
+            latency_ms = (time.perf_counter() - started) * 1000
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            return latency_ms, response.status_code, body
+
+        # warm connections and the model before measuring
+        for i in range(warmup):
+            await call(i)
+
+        counter = iter(range(requests))
+
+        async def worker() -> None:
+            for i in counter:
+                result.record(*await call(i))
+
+        result.started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.finished = time.perf_counter()
+
+    return result
+
+
+async def fetch_backend_stats(stats_url: str) -> Optional[Dict[str, Any]]:
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.get(stats_url)
+            response.raise_for_status()
+            return response.json()
+    except httpx.HTTPError:
+        return None
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    token = args.token
+    if not token:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+            token = await login(client, args.email, args.password)
+
+    ids = [value.strip() for value in args.ids.split(",") if value.strip()]
+    result = await run(
+        args.base_url,
+        token,
+        args.route,
+        ids,
+        args.concurrency,
+        args.requests,
+        args.warmup,
+        args.timeout
+    )
+
+    report = {
+        "route": args.route,
+        "distinct_ids": len(ids),
+        "concurrency": args.concurrency,
+        **result.summary()
+    }
+    if args.backend_stats_url:
+        report["backend"] = await fetch_backend_stats(args.backend_stats_url)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the /api/mcp analysis routes")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--token", help="bearer token, skips the login call")
+    parser.add_argument("--route", choices=sorted(ROUTES), default="analyze-project")
+    parser.add_argument("--ids", required=True, help="comma separated project or task ids, cycled through")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--backend-stats-url",
+        help="e.g. http://127.0.0.1:11435/stats to include the fake server's generation count"
+    )
+    args = parser.parse_args()
+
+    if not args.token and not (args.email and args.password):
+        parser.error("provide --token or --email and --password")
+
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
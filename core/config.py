@@ -13,8 +13,92 @@ class Settings(BaseSettings):
     #ollama config
     OLLAMA_BASE_URL: str
     OLLAMA_MODEL: str
+    #size-based routing to a fast small model, empty = OLLAMA_MODEL answers everything
+    LLM_SMALL_MODEL: str = ""
+    LLM_SMALL_MODEL_MAX_TASKS: int = 15
+    LLM_SMALL_MODEL_MAX_SUBTASKS: int = 40
+    #status entropy in bits, 2.0 is an even spread over the four statuses
+    LLM_SMALL_MODEL_MAX_ENTROPY: float = 1.5
+    #"key=small|large|<model>" pairs, key is an operation (project, project_chunk, task) or a route path
+    LLM_MODEL_OVERRIDES: str = ""
     OLLAMA_TIMEOUT: int
     OLLAMA_API_KEY: str
+    #shared ollama http client pool
+    OLLAMA_MAX_CONNECTIONS: int = 20
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OLLAMA_KEEPALIVE_EXPIRY: float = 60.0
+    OLLAMA_HTTP2: bool = False
+    #model residency: keep_alive sent on every request ("" = Ollama default, "-1" = forever)
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    OLLAMA_WARMUP_ON_STARTUP: bool = True
+    #heartbeat warm-up during business hours (local time, end hour exclusive)
+    OLLAMA_HEARTBEAT_ENABLED: bool = False
+    OLLAMA_HEARTBEAT_SECONDS: float = 600.0
+    OLLAMA_HEARTBEAT_START_HOUR: int = 8
+    OLLAMA_HEARTBEAT_END_HOUR: int = 18
+    OLLAMA_HEARTBEAT_WEEKDAYS_ONLY: bool = True
+    #llm analysis cache
+    LLM_CACHE_MAXSIZE: int = 1024
+    LLM_CACHE_TTL_SECONDS: int = 600
+    #stored analyses in llm_reports older than this are not reused
+    LLM_REPORT_MAX_AGE_HOURS: int = 24
+    #batch portfolio analysis
+    LLM_BATCH_CONCURRENCY: int = 4
+    #admission control in front of ollama (size max concurrency to the backends' parallel slots)
+    LLM_ADMISSION_MAX_CONCURRENCY: int = 8
+    LLM_ADMISSION_MAX_QUEUE: int = 100
+    LLM_ADMISSION_PER_USER_LIMIT: int = 4
+    LLM_ADMISSION_PER_USER_QUEUE: int = 20
+    LLM_ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 60.0
+    #how often the analyze routes check whether their client is still connected
+    LLM_DISCONNECT_POLL_SECONDS: float = 0.5
+    #answer unambiguous status distributions with rules instead of the llm
+    LLM_RULES_FAST_PATH: bool = True
+    #classifier distilled from stored llm answers, train with python -m llm.services.train_status_classifier
+    LLM_CLASSIFIER_ENABLED: bool = True
+    LLM_CLASSIFIER_PATH: str = "status_classifier.json"
+    LLM_CLASSIFIER_MIN_CONFIDENCE: float = 0.9
+    #per-backend ollama circuit breaker, an open breaker ejects the backend
+    OLLAMA_BREAKER_FAILURE_THRESHOLD: int = 5
+    OLLAMA_BREAKER_RECOVERY_SECONDS: float = 30.0
+    #hedged requests across OLLAMA_BASE_URL backends (comma separated)
+    OLLAMA_HEDGE_ENABLED: bool = False
+    OLLAMA_HEDGE_PERCENTILE: float = 95.0
+    OLLAMA_HEDGE_MIN_SAMPLES: int = 20
+    #estimated token budget for a whole analysis prompt
+    LLM_PROMPT_TOKEN_BUDGET: int = 1500
+    #projects with at least this many tasks are analyzed map-reduce style
+    LLM_MAP_REDUCE_MIN_TASKS: int = 80
+    LLM_MAP_REDUCE_CHUNK_SIZE: int = 40
+    LLM_MAP_REDUCE_CONCURRENCY: int = 4
+    #delta prompts: previous project analysis plus the tasks changed since, full prompt past these limits
+    LLM_DELTA_PROMPTS: bool = True
+    LLM_DELTA_MAX_CHANGED_TASKS: int = 30
+    LLM_DELTA_MAX_CHANGE_RATIO: float = 0.25
+    #deltas in a row before a full analysis resets accumulated drift
+    LLM_DELTA_MAX_CHAIN: int = 5
+    LLM_DELTA_BASELINE_MAXSIZE: int = 2048
+    LLM_DELTA_BASELINE_TTL_SECONDS: int = 86400
+    #constrain generation to the response JSON schema
+    LLM_STRUCTURED_OUTPUT: bool = True
+    #stop reading (and generating) once the JSON answer is complete, with or without the schema constraint
+    LLM_EARLY_STOP: bool = True
+    #how long to wait after the answer for the final chunk with token counts and durations
+    LLM_EARLY_STOP_STATS_GRACE_MS: int = 200
+    #generation caps per operation (num_predict / max_tokens)
+    LLM_MAX_TOKENS_PROJECT: int = 512
+    LLM_MAX_TOKENS_PROJECT_CHUNK: int = 256
+    LLM_MAX_TOKENS_TASK: int = 256
+    #background llm job queue (0 workers = this process only enqueues)
+    LLM_JOB_WORKERS: int = 2
+    LLM_JOB_POLL_SECONDS: float = 2.0
+    LLM_JOB_LEASE_SECONDS: int = 300
+    LLM_JOB_MAX_ATTEMPTS: int = 3
+    LLM_JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+    LLM_JOB_MAX_WAIT_SECONDS: float = 30.0
+    #re-analysis of projects with task changes (0 interval = disabled)
+    LLM_REANALYZE_INTERVAL_SECONDS: float = 300.0
+    LLM_REANALYZE_MAX_PER_TICK: int = 20
 
     # REDIS_PORT: int = 6379
     # REDIS_HOST: str = "localhost"
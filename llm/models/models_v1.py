@@ -0,0 +1,49 @@
+from uuid import uuid4
+
+from llm.utils.enum import JobKind, JobStatus
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Text,
+    Integer,
+    ForeignKey,
+    Index,
+    Enum as SQLEnum,
+)
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, JSONB
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class LLMJob(Base):
+    __tablename__ = "llm_jobs"
+
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
+    kind = Column(SQLEnum(JobKind), nullable=False)
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.queued)
+    project_id = Column(PGUUID(as_uuid=True), ForeignKey("projects.id"), nullable=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True)
+    created_by = Column(PGUUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # queued jobs become claimable at run_after, running jobs again once the lease expires
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    # what the job returns: the decorated analysis or the status update outcome.
+    # report_id is the llm_reports row of the analysis it was made from, None for rules answers
+    result = Column(JSONB, nullable=True)
+    report_id = Column(PGUUID(as_uuid=True), ForeignKey("llm_reports.id"), nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    report = relationship("LLMReport")
+
+    __table_args__ = (
+        Index("ix_llm_jobs_status_run_after", "status", "run_after"),
+    )
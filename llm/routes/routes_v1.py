@@ -1,14 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import or_, select
+from typing import Dict, Any, AsyncIterator, Awaitable, List, Optional
 from uuid import UUID
+import asyncio
+import json
 
-from core.database import get_db
+from core.config import settings
+from core.database_async import get_async_session
 from core.authentication import get_current_user
 from users.models.models_v1 import User
 from projects.models.models_v1 import Project, Task
+from teams.models.models_v1 import Team
+from llm.schemas.schemas_v1 import BatchAnalyzeRequest, JobCreateRequest, JobOut
+from llm.models.models_v1 import LLMJob
+from llm.utils.enum import JobKind, JobStatus, Priority
 
 from llm.services.qwen_service_ollama import qwen_service
+from llm.services.llm_metrics import llm_metrics
+from llm.services.admission import admission, set_caller, PRIORITY_RANK
+from llm.services.model_router import model_router, set_route
+from llm.services.status_classifier import status_classifier
+from llm.services.analysis_service import (
+    project_to_data,
+    load_project_data,
+    load_task_data,
+    analyze_project,
+    analyze_task,
+    stream_project_analysis,
+    stream_task_analysis,
+    STATUS_UPDATE_MIN_CONFIDENCE,
+)
+from llm.services.single_flight import single_flight
+from llm.services.job_queue import enqueue_job, job_to_dict, job_notifier
+from llm.services.reanalysis_scheduler import dirty_projects
 
 
 router = APIRouter(
@@ -17,10 +44,125 @@ router = APIRouter(
 )
 
 
+def _parse_project_id(project_id: str) -> UUID:
+    try:
+        return UUID(project_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid project UUID")
+
+
+async def _load_project_data(project_id: str, session: AsyncSession) -> Dict[str, Any]:
+    # Fetch project with all tasks and subtasks
+    project_data = await load_project_data(session, _parse_project_id(project_id))
+    
+    if not project_data:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # snapshot is plain data now, don't keep a connection checked out during the LLM call
+    await session.close()
+    return project_data
+
+
+async def _load_task_data(task_id: int, session: AsyncSession) -> Dict[str, Any]:
+    task_data = await load_task_data(session, task_id)
+    
+    if not task_data:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    await session.close()
+    return task_data
+
+
+async def _load_visible_projects_data(
+    session: AsyncSession,
+    user_id: UUID,
+    project_ids: List[UUID] | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Load snapshots for many projects at once.
+    selectinload keeps this at one query per level instead of one per project.
+    """
+    query = (
+        select(Project)
+        .options(
+            selectinload(Project.tasks)
+            .selectinload(Task.subtasks)
+        )
+        .where(
+            Project.is_active.is_(True),
+            or_(
+                Project.created_by == user_id,
+                Project.team.has(Team.team_members.any(User.id == user_id))
+            )
+        )
+    )
+    if project_ids is not None:
+        query = query.where(Project.id.in_(project_ids))
+
+    result = await session.execute(query)
+    projects_data = [project_to_data(project) for project in result.scalars()]
+    await session.close()
+    return projects_data
+
+
+def llm_caller(default: Priority):
+    """
+    Current user dependency that also tags the request's LLM calls for
+    admission control and model routing overrides.
+    X-LLM-Priority can only lower the route's default class, so a client
+    cannot jump the queue by claiming to be interactive.
+    """
+    async def dependency(
+        request: Request,
+        x_llm_priority: Optional[Priority] = Header(None),
+        current_user: User = Depends(get_current_user)
+    ) -> User:
+        priority = default
+        if x_llm_priority is not None and PRIORITY_RANK[x_llm_priority] > PRIORITY_RANK[default]:
+            priority = x_llm_priority
+        set_caller(priority, current_user.id)
+        set_route(getattr(request.scope.get("route"), "path", None))
+        return current_user
+    return dependency
+
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run an analysis while watching the client. If it disconnects, the analysis
+    is cancelled, which frees its admission slot and closes the Ollama request
+    unless another coalesced caller still waits for the same answer.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.LLM_DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                # nobody reads this, nginx's code for a client that went away
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        # cancelled ourselves (server shutdown, in-process MCP caller gone)
+        if not task.done():
+            task.cancel()
+
+
+def _budget_seconds(budget_ms: Optional[int]) -> Optional[float]:
+    return budget_ms / 1000 if budget_ms is not None else None
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 async def analyze_project_status(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+    debug: bool = False,
+    budget_ms: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Analyze project status using AI based on all tasks and subtasks.
@@ -31,6 +173,8 @@ async def analyze_project_status(
     
     Args:
         project_id: UUID of the project to analyze
+        debug: include LLM call telemetry (tokens, durations, waits)
+        budget_ms: latency budget, past it the rule-based answer is returned
         
     Returns:
         Dictionary with analysis results including:
@@ -40,63 +184,24 @@ async def analyze_project_status(
         - completion_percentage: Overall completion percentage
         - task_summary: Summary of task statuses
     """
-    try:
-        project_uuid = UUID(project_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid project UUID")
-    
-    # Fetch project with all tasks and subtasks
-    project = (
-        db.query(Project)
-        .options(
-            joinedload(Project.tasks)
-            .joinedload(Task.subtasks)
-        )
-        .filter(Project.id == project_uuid)
-        .first()
-    )
-    
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    project_data = await _load_project_data(project_id, session)
     
-    # Convert to dictionary for Qwen
-    project_data = {
-        "id": str(project.id),
-        "name": project.name,
-        "description": project.description,
-        "status": project.status.value,
-        "deadline": str(project.deadline),
-        "tasks": [
-            {
-                "id": task.id,
-                "title": task.title,
-                "status": task.status.value,
-                "deadline": str(task.deadline) if task.deadline else None,
-                "subtasks": [
-                    {
-                        "id": subtask.id,
-                        "title": subtask.title,
-                        "status": subtask.status.value
-                    }
-                    for subtask in task.subtasks
-                ]
-            }
-            for task in project.tasks
-        ]
-    }
-    
-    analysis = await qwen_service.calculate_project_status(project_data)
+    analysis = await analyze_project(project_data, _budget_seconds(budget_ms))
     
-    analysis["current_status"] = project.status.value
-    analysis["project_name"] = project.name
-    analysis["total_tasks"] = len(project.tasks)
+    analysis["current_status"] = project_data["status"]
+    analysis["project_name"] = project_data["name"]
+    analysis["total_tasks"] = len(project_data["tasks"])
+    if not debug:
+        analysis.pop("telemetry", None)
     
     return analysis
 
 async def analyze_task_status(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+    debug: bool = False,
+    budget_ms: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Analyze task status based on subtasks using AI.
@@ -106,6 +211,8 @@ async def analyze_task_status(
     
     Args:
         task_id: ID of the task to analyze
+        debug: include LLM call telemetry (tokens, durations, waits)
+        budget_ms: latency budget, past it the rule-based answer is returned
         
     Returns:
         Dictionary with:
@@ -114,42 +221,21 @@ async def analyze_task_status(
         - reasoning: Explanation
         - completion_percentage: Percentage of subtasks done
     """
-    task = (
-        db.query(Task)
-        .options(joinedload(Task.subtasks))
-        .filter(Task.id == task_id)
-        .first()
-    )
+    task_data = await _load_task_data(task_id, session)
     
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    analysis = await analyze_task(task_data, _budget_seconds(budget_ms))
     
-    task_data = {
-        "id": task.id,
-        "title": task.title,
-        "status": task.status.value,
-        "deadline": str(task.deadline) if task.deadline else None,
-        "subtasks": [
-            {
-                "id": subtask.id,
-                "title": subtask.title,
-                "status": subtask.status.value
-            }
-            for subtask in task.subtasks
-        ]
-    }
-    
-    analysis = await qwen_service.calculate_task_status_from_subtask(task_data)
-    
-    analysis["current_status"] = task.status.value
-    analysis["task_title"] = task.title
-    analysis["subtask_count"] = len(task.subtasks)
+    analysis["current_status"] = task_data["status"]
+    analysis["task_title"] = task_data["title"]
+    analysis["subtask_count"] = len(task_data["subtasks"])
+    if not debug:
+        analysis.pop("telemetry", None)
     
     return analysis
 
 async def calculate_project_completion(
     project_id: str,
-    db: Session = Depends(get_db)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Dict[str, Any]:
     """
     Calculate detailed completion statistics for a project.
@@ -160,17 +246,14 @@ async def calculate_project_completion(
     Returns:
         Detailed completion metrics including task breakdown
     """
-    try:
-        project_uuid = UUID(project_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid project UUID")
+    project_uuid = _parse_project_id(project_id)
     
-    project = (
-        db.query(Project)
-        .options(joinedload(Project.tasks))
-        .filter(Project.id == project_uuid)
-        .first()
+    result = await session.execute(
+        select(Project)
+        .options(selectinload(Project.tasks))
+        .where(Project.id == project_uuid)
     )
+    project = result.scalar_one_or_none()
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -216,7 +299,7 @@ async def calculate_project_completion(
 
 async def update_project_status_intelligent(
     project_id: str,
-    db: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
@@ -231,13 +314,13 @@ async def update_project_status_intelligent(
     Returns:
         Update result with old and new status
     """
-    analysis = await analyze_project_status(project_id, db, current_user)
+    analysis = await analyze_project_status(project_id, session, current_user)
     
     recommended = analysis.get("recommended_status")
     confidence = analysis.get("confidence", 0)
     
     # Only update if confidence is high
-    if confidence < 0.7:
+    if confidence < STATUS_UPDATE_MIN_CONFIDENCE:
         return {
             "updated": False,
             "reason": f"Confidence too low ({confidence:.2f})",
@@ -245,12 +328,7 @@ async def update_project_status_intelligent(
             "current_status": analysis["current_status"]
         }
     
-    try:
-        project_uuid = UUID(project_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid project UUID")
-    
-    project = db.query(Project).filter(Project.id == project_uuid).first()
+    project = await session.get(Project, _parse_project_id(project_id))
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -261,7 +339,7 @@ async def update_project_status_intelligent(
     
     # Update status
     project.status = Status[recommended]
-    db.commit()
+    await session.commit()
     
     return {
         "updated": True,
@@ -277,39 +355,280 @@ async def update_project_status_intelligent(
 @router.post("/analyze-project/{project_id}")
 async def http_analyze_project(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    debug: bool = Query(False),
+    budget_ms: Optional[int] = Query(None, ge=0),
+    x_llm_budget_ms: Optional[int] = Header(None, ge=0),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(llm_caller(Priority.interactive))
 ):
-    """HTTP endpoint wrapper for project analysis"""
-    return await analyze_project_status(project_id, db, current_user)
+    """HTTP endpoint wrapper for project analysis, ?budget_ms= wins over X-LLM-Budget-Ms"""
+    return await _cancel_on_disconnect(request, analyze_project_status(
+        project_id,
+        session,
+        current_user,
+        debug,
+        budget_ms if budget_ms is not None else x_llm_budget_ms
+    ))
 
 
 @router.post("/analyze-task/{task_id}")
 async def http_analyze_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    debug: bool = Query(False),
+    budget_ms: Optional[int] = Query(None, ge=0),
+    x_llm_budget_ms: Optional[int] = Header(None, ge=0),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(llm_caller(Priority.interactive))
+):
+    """
+    HTTP endpoint wrapper for task analysis.
+    ?budget_ms= (or X-LLM-Budget-Ms) bounds the wait, the LLM answer still fills the cache.
+    """
+    return await _cancel_on_disconnect(request, analyze_task_status(
+        task_id,
+        session,
+        current_user,
+        debug,
+        budget_ms if budget_ms is not None else x_llm_budget_ms
+    ))
+
+
+async def _stream_project_events(project_data: Dict[str, Any]) -> AsyncIterator[str]:
+    async for event in stream_project_analysis(project_data):
+        if event["event"] == "token":
+            yield _sse("token", event["data"])
+            continue
+        analysis = event["data"]
+
+    analysis["current_status"] = project_data["status"]
+    analysis["project_name"] = project_data["name"]
+    analysis["total_tasks"] = len(project_data["tasks"])
+    yield _sse("result", analysis)
+
+
+async def _stream_task_events(task_data: Dict[str, Any]) -> AsyncIterator[str]:
+    async for event in stream_task_analysis(task_data):
+        if event["event"] == "token":
+            yield _sse("token", event["data"])
+            continue
+        analysis = event["data"]
+
+    analysis["current_status"] = task_data["status"]
+    analysis["task_title"] = task_data["title"]
+    analysis["subtask_count"] = len(task_data["subtasks"])
+    yield _sse("result", analysis)
+
+
+async def _batch_project_lines(
+    projects_data: List[Dict[str, Any]],
+    missing_ids: List[str]
+) -> AsyncIterator[str]:
+    semaphore = asyncio.Semaphore(settings.LLM_BATCH_CONCURRENCY)
+
+    async def analyze_one(project_data: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                analysis = await analyze_project(project_data)
+            except Exception as e:
+                return {"project_id": project_data["id"], "error": str(e)}
+
+        analysis["current_status"] = project_data["status"]
+        analysis["project_name"] = project_data["name"]
+        analysis["total_tasks"] = len(project_data["tasks"])
+        analysis.pop("telemetry", None)
+        return {"project_id": project_data["id"], "analysis": analysis}
+
+    for project_id in missing_ids:
+        yield json.dumps({
+            "project_id": project_id,
+            "error": "Project not found or access denied"
+        }) + "\n"
+
+    tasks = [asyncio.create_task(analyze_one(data)) for data in projects_data]
+    try:
+        # emit each project as soon as it is done, not in request order
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done, default=str) + "\n"
+    finally:
+        # client went away mid-stream
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/analyze-projects/batch")
+async def http_analyze_projects_batch(
+    payload: BatchAnalyzeRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(llm_caller(Priority.background))
+):
+    """
+    Analyze many projects in one call, streamed back as NDJSON.
+
+    Takes explicit project_ids or all_visible=true. Analyses run with at most
+    LLM_BATCH_CONCURRENCY generations at a time and each line is written as
+    soon as its project finishes.
+    """
+    if payload.all_visible:
+        requested = None
+    elif payload.project_ids:
+        requested = list(dict.fromkeys(payload.project_ids))
+    else:
+        raise HTTPException(status_code=400, detail="Provide project_ids or set all_visible")
+
+    projects_data = await _load_visible_projects_data(session, current_user.id, requested)
+
+    found = {data["id"] for data in projects_data}
+    missing_ids = [str(pid) for pid in requested or [] if str(pid) not in found]
+
+    return StreamingResponse(
+        _batch_project_lines(projects_data, missing_ids),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post("/analyze-project/{project_id}/stream")
+async def http_analyze_project_stream(
+    project_id: str,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(llm_caller(Priority.interactive))
+):
+    """
+    Server-Sent Events variant of project analysis.
+    Emits "token" events while Qwen generates and a final "result" event.
+    """
+    project_data = await _load_project_data(project_id, session)
+    return StreamingResponse(
+        _stream_project_events(project_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/analyze-task/{task_id}/stream")
+async def http_analyze_task_stream(
+    task_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(llm_caller(Priority.interactive))
+):
+    """
+    Server-Sent Events variant of task analysis.
+    Emits "token" events while Qwen generates and a final "result" event.
+    """
+    task_data = await _load_task_data(task_id, session)
+    return StreamingResponse(
+        _stream_task_events(task_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs", response_model=JobOut, status_code=status.HTTP_202_ACCEPTED)
+async def http_submit_job(
+    payload: JobCreateRequest,
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
-    """HTTP endpoint wrapper for task analysis"""
-    return await analyze_task_status(task_id, db, current_user)
+    """
+    Queue an analysis or intelligent status update to run in the background.
+    Poll GET /api/mcp/jobs/{job_id} (optionally with ?wait=) for the result.
+    """
+    if payload.kind == JobKind.analyze_task:
+        if payload.task_id is None:
+            raise HTTPException(status_code=400, detail="task_id is required for analyze_task")
+        if await session.get(Task, payload.task_id) is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+    else:
+        if payload.project_id is None:
+            raise HTTPException(status_code=400, detail=f"project_id is required for {payload.kind.value}")
+        if await session.get(Project, payload.project_id) is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+    job = await enqueue_job(
+        session,
+        payload.kind,
+        project_id=payload.project_id,
+        task_id=payload.task_id,
+        created_by=current_user.id
+    )
+    return job_to_dict(job)
+
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def http_get_job(
+    job_id: UUID,
+    wait: float = Query(0, ge=0, le=settings.LLM_JOB_MAX_WAIT_SECONDS),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Job status and, once done, its result.
+    With wait > 0 the request long-polls up to that many seconds for the job to finish.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    while True:
+        job = await session.get(LLMJob, job_id, populate_existing=True)
+        if job is None or job.created_by != current_user.id:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        remaining = deadline - loop.time()
+        if job.status in (JobStatus.done, JobStatus.failed):
+            # it may have finished in another process, release local waiters
+            job_notifier.notify(job_id)
+            return job_to_dict(job)
+        if remaining <= 0:
+            return job_to_dict(job)
+
+        # give the connection back while waiting
+        await session.rollback()
+        await job_notifier.wait(job_id, timeout=min(remaining, settings.LLM_JOB_POLL_SECONDS))
+
+
+@router.get("/llm-status")
+async def http_llm_status(
+    current_user: User = Depends(get_current_user)
+):
+    """Ollama backends with their breaker state, model routing, the status classifier and pending re-analysis work"""
+    return {
+        "model": qwen_service.model,
+        "routing": model_router.snapshot(),
+        "classifier": status_classifier.snapshot(),
+        "backends": qwen_service.backends.snapshot(),
+        "dirty_projects": len(dirty_projects)
+    }
+
+
+@router.get("/metrics")
+async def http_llm_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """LLM call counters, per-operation latency/token histograms, admission queue and coalescing state"""
+    return {
+        **llm_metrics.snapshot(),
+        "admission": admission.snapshot(),
+        "single_flight": single_flight.snapshot()
+    }
 
 
 @router.get("/project-completion/{project_id}")
 async def http_project_completion(
     project_id: str,
-    db: Session = Depends(get_db)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """HTTP endpoint for completion statistics"""
-    return await calculate_project_completion(project_id, db)
+    return await calculate_project_completion(project_id, session)
 
 
 @router.post("/update-project-status/{project_id}")
 async def http_update_project_status(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(llm_caller(Priority.interactive))
 ):
     """HTTP endpoint for intelligent status update"""
-    return await update_project_status_intelligent(project_id, db, current_user)
+    return await update_project_status_intelligent(project_id, session, current_user)
 
 
@@ -0,0 +1,33 @@
+from uuid import UUID
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from llm.utils.enum import JobKind, JobStatus
+
+
+class BatchAnalyzeRequest(BaseModel):
+    project_ids: Optional[List[UUID]] = None
+    # analyze every active project the caller can see instead of project_ids
+    all_visible: bool = False
+
+
+class JobCreateRequest(BaseModel):
+    kind: JobKind
+    project_id: Optional[UUID] = None
+    task_id: Optional[int] = None
+
+
+class JobOut(BaseModel):
+    id: UUID
+    kind: JobKind
+    status: JobStatus
+    project_id: Optional[UUID]
+    task_id: Optional[int]
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str]
+    report_id: Optional[UUID]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    result: Optional[Dict[str, Any]] = None
@@ -0,0 +1,298 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+from llm.utils.enum import Priority
+from llm.services.llm_metrics import llm_metrics
+
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(Priority)}
+
+# who is asking, set per request by the routes and per job by the worker;
+# tasks started on behalf of a caller (single-flight, map-reduce) inherit it
+_caller_priority: ContextVar[Priority] = ContextVar("llm_caller_priority", default=Priority.interactive)
+_caller_user: ContextVar[Optional[str]] = ContextVar("llm_caller_user", default=None)
+# set inside work shared by coalesced callers (single-flight), see CallerGroup
+_caller_group: ContextVar[Optional["CallerGroup"]] = ContextVar("llm_caller_group", default=None)
+
+
+def set_caller(priority: Priority, user_id: Optional[Any]) -> None:
+    _caller_priority.set(priority)
+    _caller_user.set(str(user_id) if user_id is not None else None)
+
+
+def current_caller() -> Tuple[Priority, Optional[str]]:
+    return _caller_priority.get(), _caller_user.get()
+
+
+class AdmissionRejected(HTTPException):
+    """Load shed: 429 when one caller has too much queued, 503 when the queue is full"""
+
+    def __init__(
+            self,
+            status_code: int,
+            detail: str,
+            retry_after: int,
+            caller: Optional[Tuple[Priority, Optional[str]]] = None
+    ):
+        super().__init__(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+        # whose priority and per-user cap the call was shed under
+        self.caller = caller
+
+
+class CallerGroup:
+    """
+    Callers coalesced onto one shared call. The shared call's LLM calls are
+    admitted as the best of them (highest priority, that caller's user), and
+    its queued calls are promoted when a better caller joins, so an
+    interactive user joining a batch user's analysis does not wait at
+    background priority.
+    """
+
+    def __init__(self):
+        self._callers: List[Tuple[Priority, Optional[str]]] = []
+        self._queued: Set["_Waiter"] = set()
+
+    def bind(self) -> None:
+        """Make LLM calls in the current context (the shared task) admit as this group"""
+        _caller_group.set(self)
+
+    def join(self, caller: Tuple[Priority, Optional[str]]) -> None:
+        self._callers.append(caller)
+        best = self.best()
+        for waiter in list(self._queued):
+            admission.promote(waiter, *best)
+
+    def leave(self, caller: Tuple[Priority, Optional[str]]) -> None:
+        # queued calls keep their place, only later calls see the change
+        if caller in self._callers:
+            self._callers.remove(caller)
+
+    def best(self) -> Tuple[Priority, Optional[str]]:
+        if not self._callers:
+            return current_caller()
+        return min(self._callers, key=lambda caller: PRIORITY_RANK[caller[0]])
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, seq: int, user: Optional[str]):
+        self.priority = priority
+        self.seq = seq
+        self.user = user
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def sort_key(self):
+        return PRIORITY_RANK[self.priority], self.seq
+
+
+class AdmissionScheduler:
+    """
+    Admission control in front of the Ollama client.
+
+    At most `max_concurrency` calls run at once and one user holds at most
+    `per_user_limit` of them. Everything else waits in one bounded queue
+    served by priority class (interactive, then MCP tools, then background)
+    and FIFO within a class, skipping users who are at their cap so one
+    user's batch cannot starve others.
+
+    When the queue is full a higher-priority arrival evicts the newest
+    lowest-priority waiter; otherwise the arrival is shed with 503. A user
+    with `per_user_queue` calls already waiting is shed with 429.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            max_queue: int,
+            per_user_limit: int,
+            per_user_queue: int,
+            queue_timeout: float
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.per_user_limit = per_user_limit
+        self.per_user_queue = per_user_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self._running_by_user: Dict[str, int] = {}
+        self._queued_by_user: Dict[str, int] = {}
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one Ollama slot for the caller (or caller group) in the current context"""
+        group = _caller_group.get()
+        priority, user = group.best() if group is not None else current_caller()
+        started = time.perf_counter()
+        # a promoted waiter may have been started under another user
+        priority, user = await self._acquire(priority, user, group)
+        llm_metrics.observe("admission_wait_ms", priority.value, (time.perf_counter() - started) * 1000)
+        try:
+            yield
+        finally:
+            self._release(user)
+
+    def promote(self, waiter: "_Waiter", priority: Priority, user: Optional[str]) -> None:
+        """Requeue a waiting call under a better priority (and that caller's user)"""
+        if PRIORITY_RANK[priority] >= PRIORITY_RANK[waiter.priority] or not self._remove(waiter):
+            return
+        waiter.priority = priority
+        waiter.user = user
+        self._enqueue(waiter)
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        queued_by_priority = {priority.value: 0 for priority in Priority}
+        for waiter in self._queue:
+            queued_by_priority[waiter.priority.value] += 1
+        return {
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "queued_by_priority": queued_by_priority,
+            "users_running": len(self._running_by_user),
+            "users_queued": len(self._queued_by_user)
+        }
+
+    async def _acquire(
+            self,
+            priority: Priority,
+            user: Optional[str],
+            group: Optional[CallerGroup] = None
+    ) -> Tuple[Priority, Optional[str]]:
+        # anything still queued is blocked by its own user's cap, so a caller
+        # that fits may go straight in without jumping a runnable waiter
+        if self.running < self.max_concurrency and self._has_room(user):
+            self._start(user)
+            return priority, user
+
+        if user is not None and self._queued_by_user.get(user, 0) >= self.per_user_queue:
+            self._reject(priority, "user")
+            raise AdmissionRejected(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many LLM requests queued for this user",
+                retry_after=5,
+                caller=(priority, user)
+            )
+
+        if len(self._queue) >= self.max_queue:
+            worst = self._queue[-1]
+            if PRIORITY_RANK[priority] >= PRIORITY_RANK[worst.priority]:
+                self._reject(priority, "queue_full")
+                raise AdmissionRejected(
+                    status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "LLM queue is full",
+                    retry_after=10,
+                    caller=(priority, user)
+                )
+            self._remove(worst)
+            self._reject(worst.priority, "evicted")
+            worst.future.set_exception(AdmissionRejected(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Evicted from the LLM queue by higher priority work",
+                retry_after=10,
+                caller=(worst.priority, worst.user)
+            ))
+
+        waiter = _Waiter(priority, next(self._seq), user)
+        self._enqueue(waiter)
+        if group is not None:
+            group._queued.add(waiter)
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if self._remove(waiter):
+                if isinstance(e, asyncio.TimeoutError):
+                    self._reject(waiter.priority, "timeout")
+                    raise AdmissionRejected(
+                        status.HTTP_503_SERVICE_UNAVAILABLE,
+                        "Timed out waiting for an LLM slot",
+                        retry_after=10,
+                        caller=(waiter.priority, waiter.user)
+                    )
+            elif waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # granted a slot just as the caller gave up
+                self._release(waiter.user)
+            raise
+        finally:
+            if group is not None:
+                group._queued.discard(waiter)
+        return waiter.priority, waiter.user
+
+    def _has_room(self, user: Optional[str]) -> bool:
+        return user is None or self._running_by_user.get(user, 0) < self.per_user_limit
+
+    def _start(self, user: Optional[str]) -> None:
+        self.running += 1
+        if user is not None:
+            self._running_by_user[user] = self._running_by_user.get(user, 0) + 1
+
+    def _release(self, user: Optional[str]) -> None:
+        self.running -= 1
+        if user is not None:
+            remaining = self._running_by_user.get(user, 1) - 1
+            if remaining:
+                self._running_by_user[user] = remaining
+            else:
+                self._running_by_user.pop(user, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        i = 0
+        while self.running < self.max_concurrency and i < len(self._queue):
+            waiter = self._queue[i]
+            if waiter.future.done():
+                # its caller gave up and has not cleaned up yet
+                self._remove(waiter)
+                continue
+            if self._has_room(waiter.user):
+                self._remove(waiter)
+                self._start(waiter.user)
+                waiter.future.set_result(None)
+                continue
+            i += 1
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        index = len(self._queue)
+        while index > 0 and self._queue[index - 1].sort_key > waiter.sort_key:
+            index -= 1
+        self._queue.insert(index, waiter)
+        if waiter.user is not None:
+            self._queued_by_user[waiter.user] = self._queued_by_user.get(waiter.user, 0) + 1
+
+    def _remove(self, waiter: _Waiter) -> bool:
+        try:
+            self._queue.remove(waiter)
+        except ValueError:
+            return False
+        if waiter.user is not None:
+            remaining = self._queued_by_user.get(waiter.user, 1) - 1
+            if remaining:
+                self._queued_by_user[waiter.user] = remaining
+            else:
+                self._queued_by_user.pop(waiter.user, None)
+        return True
+
+    def _reject(self, priority: Priority, reason: str) -> None:
+        llm_metrics.increment(f"admission_rejected_{reason}", priority.value)
+
+
+admission = AdmissionScheduler(
+    max_concurrency=settings.LLM_ADMISSION_MAX_CONCURRENCY,
+    max_queue=settings.LLM_ADMISSION_MAX_QUEUE,
+    per_user_limit=settings.LLM_ADMISSION_PER_USER_LIMIT,
+    per_user_queue=settings.LLM_ADMISSION_PER_USER_QUEUE,
+    queue_timeout=settings.LLM_ADMISSION_QUEUE_TIMEOUT_SECONDS
+)
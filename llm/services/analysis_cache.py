@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+from cachetools import TTLCache
+
+from core.config import settings
+
+
+class _ReportingTTLCache(TTLCache):
+    """TTLCache that reports every key it evicts or expires on its own"""
+
+    def __init__(self, maxsize: int, ttl: int, on_remove: Callable[[str], None]):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._on_remove = on_remove
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, _ in expired:
+            self._on_remove(key)
+        return expired
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_remove(key)
+        return key, value
+
+
+class AnalysisCache:
+    """
+    Bounded LRU+TTL cache of LLM analyses keyed on a snapshot hash.
+
+    The key covers the normalized project/task data, the model name and
+    the prompt version, so any status change produces a new key. Entries are
+    also indexed by project and task id so repository writes can drop them
+    eagerly instead of waiting for the TTL. The index follows the cache, a
+    key evicted or expired is dropped from it too.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        # called back with the lock already held
+        self._entries = _ReportingTTLCache(maxsize=maxsize, ttl=ttl, on_remove=self._unindex)
+        self._index: Dict[str, Set[str]] = {}
+        # refs each key is indexed under, to unindex it without scanning
+        self._refs: Dict[str, Set[str]] = {}
+        # task routes are sync and run in the threadpool
+        self._lock = threading.Lock()
+
+    def make_key(
+            self,
+            kind: str,
+            data: Dict[str, Any],
+            model: str,
+            prompt_version: str
+    ) -> str:
+        """Hash the normalized snapshot together with model and prompt version"""
+        normalized = json.dumps(
+            self._normalize(data),
+            sort_keys=True,
+            default=str,
+            separators=(",", ":")
+        )
+        raw = f"{kind}|{model}|{prompt_version}|{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._entries.get(key)
+        # callers decorate the result, never hand out the cached dict itself
+        return dict(value) if value is not None else None
+
+    def set(
+            self,
+            key: str,
+            value: Dict[str, Any],
+            project_id: Optional[Any] = None,
+            task_id: Optional[Any] = None
+    ) -> None:
+        with self._lock:
+            self._entries[key] = dict(value)
+            if project_id is not None:
+                self._add_ref(f"project:{project_id}", key)
+            if task_id is not None:
+                self._add_ref(f"task:{task_id}", key)
+
+    def invalidate_project(self, project_id: Any) -> None:
+        self._invalidate(f"project:{project_id}")
+
+    def invalidate_task(self, task_id: Any) -> None:
+        self._invalidate(f"task:{task_id}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._refs.clear()
+
+    def _invalidate(self, ref: str) -> None:
+        with self._lock:
+            for key in self._index.pop(ref, set()):
+                self._entries.pop(key, None)
+                self._unindex(key)
+
+    def _add_ref(self, ref: str, key: str) -> None:
+        self._index.setdefault(ref, set()).add(key)
+        self._refs.setdefault(key, set()).add(ref)
+
+    def _unindex(self, key: str) -> None:
+        for ref in self._refs.pop(key, set()):
+            keys = self._index.get(ref)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._index[ref]
+
+    def _normalize(self, value: Any) -> Any:
+        """Sort id-bearing lists so row order from the DB does not change the hash"""
+        if isinstance(value, dict):
+            return {k: self._normalize(v) for k, v in value.items()}
+        if isinstance(value, list):
+            items = [self._normalize(v) for v in value]
+            if all(isinstance(v, dict) and "id" in v for v in items):
+                items.sort(key=lambda v: str(v["id"]))
+            return items
+        return value
+
+
+def is_cacheable(analysis: Dict[str, Any]) -> bool:
+    """Fallback and parse-failure answers should be retried, not cached"""
+    return not analysis.get("fallback") and "error" not in analysis
+
+
+analysis_cache = AnalysisCache(
+    maxsize=settings.LLM_CACHE_MAXSIZE,
+    ttl=settings.LLM_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,366 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from core.config import settings
+from core.database_async import AsyncSessionLocal
+from projects.models.models_v1 import Project, Task
+from reports.models.models_v1 import LLMReport
+from llm.services.qwen_service_ollama import qwen_service, PROMPT_VERSION
+from llm.services.analysis_cache import analysis_cache, is_cacheable
+from llm.services.single_flight import single_flight
+from llm.services.admission import AdmissionRejected, CallerGroup, current_caller
+from llm.services.llm_metrics import llm_metrics
+from llm.services.status_classifier import snapshot_counts
+
+# below this an analysis is reported but the project status is left alone
+STATUS_UPDATE_MIN_CONFIDENCE = 0.7
+
+# callers coalesced on each in-flight analysis, so its LLM calls are admitted as the best of them
+_caller_groups: Dict[str, CallerGroup] = {}
+
+
+def project_to_data(project: Project) -> Dict[str, Any]:
+    """Convert a project with tasks and subtasks loaded into the dict Qwen analyzes"""
+    return {
+        "id": str(project.id),
+        "name": project.name,
+        "description": project.description,
+        "status": project.status.value,
+        "deadline": str(project.deadline),
+        "tasks": [
+            {
+                "id": task.id,
+                "title": task.title,
+                "status": task.status.value,
+                "deadline": str(task.deadline) if task.deadline else None,
+                "subtasks": [
+                    {
+                        "id": subtask.id,
+                        "title": subtask.title,
+                        "status": subtask.status.value
+                    }
+                    for subtask in task.subtasks
+                ]
+            }
+            for task in project.tasks
+        ]
+    }
+
+
+def task_to_data(task: Task) -> Dict[str, Any]:
+    """Convert a task with subtasks loaded into the dict Qwen analyzes"""
+    return {
+        "id": task.id,
+        "title": task.title,
+        "status": task.status.value,
+        "deadline": str(task.deadline) if task.deadline else None,
+        "subtasks": [
+            {
+                "id": subtask.id,
+                "title": subtask.title,
+                "status": subtask.status.value
+            }
+            for subtask in task.subtasks
+        ]
+    }
+
+
+def completion_percentage(analysis: Dict[str, Any]) -> float:
+    """completion_percentage as a float, the model does not always return a number"""
+    try:
+        return float(analysis.get("completion_percentage") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def analysis_key(kind: str, data: Dict[str, Any]) -> str:
+    """Cache and llm_reports key of a snapshot for the model that would answer it now"""
+    return analysis_cache.make_key(kind, data, qwen_service.model_for(kind, data), PROMPT_VERSION)
+
+
+async def find_stored_report(session: AsyncSession, snapshot_hash: str) -> Optional[UUID]:
+    """Id of the newest llm_reports row for a snapshot, None if its answer was never stored"""
+    result = await session.execute(
+        select(LLMReport.id)
+        .where(LLMReport.snapshot_hash == snapshot_hash)
+        .order_by(LLMReport.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def load_project_data(session: AsyncSession, project_id: UUID) -> Optional[Dict[str, Any]]:
+    """Load a project snapshot on the async engine, None if it does not exist"""
+    result = await session.execute(
+        select(Project)
+        .options(
+            selectinload(Project.tasks)
+            .selectinload(Task.subtasks)
+        )
+        .where(Project.id == project_id)
+    )
+    project = result.scalar_one_or_none()
+    return project_to_data(project) if project else None
+
+
+async def load_task_data(session: AsyncSession, task_id: int) -> Optional[Dict[str, Any]]:
+    """Load a task snapshot on the async engine, None if it does not exist"""
+    result = await session.execute(
+        select(Task)
+        .options(selectinload(Task.subtasks))
+        .where(Task.id == task_id)
+    )
+    task = result.scalar_one_or_none()
+    return task_to_data(task) if task else None
+
+
+async def analyze_project(
+        project_data: Dict[str, Any],
+        budget_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Serve a project analysis from the cache or llm_reports, calling Qwen only on a miss.
+    Concurrent misses for the same snapshot share one in-flight generation.
+    With a budget, the rule-based answer is returned if Qwen is not done in time.
+    """
+    return await _analyze(
+        "project",
+        project_data,
+        qwen_service.calculate_project_status,
+        qwen_service.fallback_project_status,
+        budget_seconds,
+        project_id=project_data["id"]
+    )
+
+
+async def analyze_task(
+        task_data: Dict[str, Any],
+        budget_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Serve a task analysis from the cache or llm_reports, calling Qwen only on a miss.
+    Concurrent misses for the same snapshot share one in-flight generation.
+    With a budget, the rule-based answer is returned if Qwen is not done in time.
+    """
+    return await _analyze(
+        "task",
+        task_data,
+        qwen_service.calculate_task_status_from_subtask,
+        qwen_service.fallback_task_status,
+        budget_seconds,
+        task_id=task_data["id"]
+    )
+
+
+async def stream_project_analysis(project_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of analyze_project: {"event": "token"} events while Qwen
+    generates, then one {"event": "result"}. Same cache and llm_reports.
+    """
+    async for event in _stream(
+        "project",
+        project_data,
+        qwen_service.stream_project_status,
+        project_id=project_data["id"]
+    ):
+        yield event
+
+
+async def stream_task_analysis(task_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming variant of analyze_task, same events as stream_project_analysis"""
+    async for event in _stream(
+        "task",
+        task_data,
+        qwen_service.stream_task_status,
+        task_id=task_data["id"]
+    ):
+        yield event
+
+
+async def _analyze(
+        kind: str,
+        data: Dict[str, Any],
+        calculate: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        fallback: Callable[[Dict[str, Any]], Dict[str, Any]],
+        budget_seconds: Optional[float] = None,
+        project_id: Optional[str] = None,
+        task_id: Optional[int] = None
+) -> Dict[str, Any]:
+    # small and large model answers are cached apart
+    cache_key = analysis_key(kind, data)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        cached["cached"] = True
+        return cached
+
+    async def compute() -> Dict[str, Any]:
+        answer = await _answer_without_llm(kind, data, cache_key, project_id, task_id)
+        if answer is not None:
+            return answer
+
+        started = time.perf_counter()
+        analysis = await calculate(data)
+        latency_ms = (time.perf_counter() - started) * 1000
+        await _keep_analysis(kind, data, cache_key, analysis, latency_ms, project_id, task_id)
+        return analysis
+
+    async def shared() -> Dict[str, Any]:
+        group.bind()
+        try:
+            return await compute()
+        finally:
+            if _caller_groups.get(cache_key) is group:
+                del _caller_groups[cache_key]
+
+    caller = current_caller()
+    try:
+        while True:
+            group = _caller_groups.get(cache_key)
+            if group is None:
+                group = _caller_groups[cache_key] = CallerGroup()
+            group.join(caller)
+            try:
+                # every coalesced waiter gets its own copy to decorate; past the budget only
+                # this waiter gives up, the shielded generation goes on and fills the cache
+                return dict(await single_flight.do(cache_key, shared, timeout=budget_seconds))
+            except AdmissionRejected as e:
+                # shed under another waiter's priority or per-user cap, try again as ourselves
+                if e.caller is None or e.caller == caller:
+                    raise
+            finally:
+                group.leave(caller)
+    except asyncio.CancelledError:
+        # the client went away, single_flight stops the generation if nobody else waits
+        llm_metrics.increment("client_disconnects", kind)
+        raise
+    except asyncio.TimeoutError:
+        llm_metrics.increment("budget_exceeded", kind)
+        result = fallback(data)
+        result["budget_exceeded"] = True
+        return result
+
+
+async def _stream(
+        kind: str,
+        data: Dict[str, Any],
+        stream: Callable[[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
+        project_id: Optional[str] = None,
+        task_id: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    cache_key = analysis_key(kind, data)
+    analysis = analysis_cache.get(cache_key)
+    if analysis is not None:
+        analysis["cached"] = True
+    else:
+        analysis = await _answer_without_llm(kind, data, cache_key, project_id, task_id)
+
+    if analysis is None:
+        started = time.perf_counter()
+        async for event in stream(data):
+            if event["event"] == "token":
+                yield event
+                continue
+            analysis = event["data"]
+        latency_ms = (time.perf_counter() - started) * 1000
+        await _keep_analysis(kind, data, cache_key, analysis, latency_ms, project_id, task_id)
+
+    # the caller decorates the result, the cached copy stays as it is
+    yield {"event": "result", "data": dict(analysis)}
+
+
+async def _answer_without_llm(
+        kind: str,
+        data: Dict[str, Any],
+        cache_key: str,
+        project_id: Optional[str],
+        task_id: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    """Rules or classifier answer, else one stored in llm_reports; None when only the LLM can answer"""
+    # rules and classifier answer in microseconds, before any DB round trip
+    fast = qwen_service.fast_answer(kind, data)
+    if fast is not None:
+        analysis_cache.set(cache_key, fast, project_id=project_id, task_id=task_id)
+        return fast
+
+    # survives restarts: same snapshot, model and prompt means same answer
+    stored = await _load_stored_analysis(cache_key)
+    if stored is not None:
+        analysis_cache.set(cache_key, stored, project_id=project_id, task_id=task_id)
+        stored["cached"] = True
+    return stored
+
+
+async def _keep_analysis(
+        kind: str,
+        data: Dict[str, Any],
+        cache_key: str,
+        analysis: Dict[str, Any],
+        latency_ms: float,
+        project_id: Optional[str],
+        task_id: Optional[int]
+) -> None:
+    """Cache a fresh answer and store it in llm_reports when it came from the LLM"""
+    if not is_cacheable(analysis):
+        return
+    analysis_cache.set(cache_key, analysis, project_id=project_id, task_id=task_id)
+    if analysis.get("source") == "llm":
+        # the counts the answer was made from are what the status classifier trains on
+        stored_result = {**analysis, "status_counts": snapshot_counts(kind, data)}
+        await _store_analysis(kind, cache_key, stored_result, latency_ms, project_id, task_id)
+
+
+async def _load_stored_analysis(snapshot_hash: str) -> Optional[Dict[str, Any]]:
+    oldest = datetime.now(timezone.utc) - timedelta(hours=settings.LLM_REPORT_MAX_AGE_HOURS)
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(LLMReport.result)
+                .where(
+                    LLMReport.snapshot_hash == snapshot_hash,
+                    LLMReport.created_at >= oldest
+                )
+                .order_by(LLMReport.created_at.desc())
+                .limit(1)
+            )
+            stored = result.scalar_one_or_none()
+            if stored is not None:
+                stored.pop("status_counts", None)
+            return stored
+    except SQLAlchemyError as e:
+        print(f"Could not read stored analysis: {e}")
+        return None
+
+
+async def _store_analysis(
+        kind: str,
+        snapshot_hash: str,
+        analysis: Dict[str, Any],
+        latency_ms: float,
+        project_id: Optional[str],
+        task_id: Optional[int]
+) -> None:
+    try:
+        async with AsyncSessionLocal() as session:
+            session.add(LLMReport(
+                text=analysis.get("reasoning") or "",
+                percentage=completion_percentage(analysis),
+                kind=kind,
+                project_id=UUID(project_id) if project_id else None,
+                task_id=task_id,
+                snapshot_hash=snapshot_hash,
+                model=analysis.get("model") or qwen_service.model,
+                latency_ms=latency_ms,
+                result=analysis
+            ))
+            await session.commit()
+    except SQLAlchemyError as e:
+        # the analysis itself succeeded, losing the stored copy is not fatal
+        print(f"Could not store analysis: {e}")
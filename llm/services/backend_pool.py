@@ -0,0 +1,99 @@
+import math
+import random
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from llm.services.circuit_breaker import CircuitBreaker
+
+
+class OllamaBackend:
+    """One Ollama host, with its own circuit breaker and in-flight count"""
+
+    def __init__(self, url: str, failure_threshold: int, eject_seconds: float):
+        self.url = url
+        # the breaker doubles as ejection: open = out of rotation until the cool-down ends
+        self.breaker = CircuitBreaker(
+            failure_threshold=failure_threshold,
+            recovery_timeout=eject_seconds
+        )
+        self.in_flight = 0
+        self.requests = 0
+
+    def start(self) -> None:
+        self.in_flight += 1
+        self.requests += 1
+
+    def finish(self) -> None:
+        self.in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "circuit_breaker": self.breaker.snapshot()
+        }
+
+
+class BackendPool:
+    """
+    Routes each call to the healthy backend with the fewest requests in flight.
+
+    A backend that keeps failing has its breaker opened and is skipped until
+    the cool-down passes, then one probe request decides whether it rejoins.
+    Recent latencies per operation give the delay after which a hedged copy
+    of a slow request is sent to a second backend.
+    """
+
+    def __init__(
+            self,
+            urls: List[str],
+            failure_threshold: int,
+            eject_seconds: float,
+            hedge_percentile: Optional[float] = None,
+            hedge_min_samples: int = 20,
+            latency_window: int = 200
+    ):
+        self.backends = [OllamaBackend(url, failure_threshold, eject_seconds) for url in urls]
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._latency_window = latency_window
+
+    def acquire(self, exclude: Optional[OllamaBackend] = None) -> Optional[OllamaBackend]:
+        """Least-outstanding healthy backend, None when every backend is ejected"""
+        candidates = [backend for backend in self.backends if backend is not exclude]
+        # shuffle first so ties do not always land on the first host
+        random.shuffle(candidates)
+        candidates.sort(key=lambda backend: backend.in_flight)
+        for backend in candidates:
+            # only ask the breaker of the backend we would use, asking lets a half-open probe through
+            if backend.breaker.allow_request():
+                return backend
+        return None
+
+    def record_latency(self, operation: str, wall_ms: float) -> None:
+        window = self._latencies.get(operation)
+        if window is None:
+            window = self._latencies[operation] = deque(maxlen=self._latency_window)
+        window.append(wall_ms)
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        """Seconds to wait before hedging, None when hedging does not apply"""
+        if self.hedge_percentile is None or len(self.backends) < 2:
+            return None
+        window = self._latencies.get(operation)
+        if window is None or len(window) < self.hedge_min_samples:
+            return None
+        ordered = sorted(window)
+        rank = max(1, math.ceil(self.hedge_percentile / 100 * len(ordered)))
+        return ordered[rank - 1] / 1000
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "hedge_percentile": self.hedge_percentile,
+            "hedge_delay_seconds": {
+                operation: self.hedge_delay(operation) for operation in self._latencies
+            },
+            "backends": [backend.snapshot() for backend in self.backends]
+        }
@@ -0,0 +1,101 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for the Ollama backend.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    callers are refused straight away so they can use the rule-based
+    fallback. Once `recovery_timeout` seconds have passed a single probe
+    request is let through (half-open): success closes the circuit, failure
+    opens it for another cool-down.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.times_opened = 0
+        self.rejected_requests = 0
+        self.last_failure: Optional[str] = None
+        self.last_state_change: Optional[datetime] = None
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._transition(self.HALF_OPEN)
+                self._probe_in_flight = True
+                return True
+            self.rejected_requests += 1
+            return False
+
+        # half-open: only one probe at a time
+        if not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected_requests += 1
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self, reason: str) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self.last_failure = reason
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def release_probe(self) -> None:
+        """The request ended without a verdict (e.g. it was cancelled)"""
+        self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "retry_in_seconds": round(retry_in, 1) if retry_in is not None else None,
+            "total_failures": self.total_failures,
+            "times_opened": self.times_opened,
+            "rejected_requests": self.rejected_requests,
+            "last_failure": self.last_failure,
+            "last_state_change": self.last_state_change.isoformat() if self.last_state_change else None
+        }
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            print(f"Ollama circuit breaker: {self.state} -> {state}")
+        self.state = state
+        self.last_state_change = datetime.now(timezone.utc)
+
+
+class OllamaUnavailableError(Exception):
+    """Raised instead of calling Ollama while the circuit is open"""
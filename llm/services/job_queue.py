@@ -0,0 +1,340 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update, or_, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database_async import AsyncSessionLocal
+from projects.models.models_v1 import Project
+from projects.utils.enum import Status
+from llm.models.models_v1 import LLMJob
+from llm.utils.enum import JobKind, JobStatus, Priority
+from llm.services.admission import set_caller
+from llm.services.analysis_service import (
+    load_project_data,
+    load_task_data,
+    analyze_project,
+    analyze_task,
+    analysis_key,
+    find_stored_report,
+    STATUS_UPDATE_MIN_CONFIDENCE,
+)
+
+
+class JobNotFoundError(Exception):
+    """The job target no longer exists, retrying will not help"""
+
+
+class JobNotifier:
+    """Wakes in-process long-pollers when a job finishes"""
+
+    def __init__(self):
+        self._events: Dict[UUID, asyncio.Event] = {}
+
+    async def wait(self, job_id: UUID, timeout: float) -> None:
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def notify(self, job_id: UUID) -> None:
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+
+job_notifier = JobNotifier()
+
+
+async def enqueue_job(
+        session: AsyncSession,
+        kind: JobKind,
+        project_id: Optional[UUID] = None,
+        task_id: Optional[int] = None,
+        created_by: Optional[UUID] = None
+) -> LLMJob:
+    job = LLMJob(
+        kind=kind,
+        status=JobStatus.queued,
+        project_id=project_id,
+        task_id=task_id,
+        created_by=created_by,
+        attempts=0,
+        max_attempts=settings.LLM_JOB_MAX_ATTEMPTS
+    )
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    job_worker.wake()
+    return job
+
+
+def job_to_dict(job: LLMJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "project_id": job.project_id,
+        "task_id": job.task_id,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "last_error": job.last_error,
+        "report_id": job.report_id,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": job.result
+    }
+
+
+class JobWorker:
+    """
+    Claims queued LLM jobs from Postgres and runs them in the background.
+
+    Claims use SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers in
+    any number of processes can share the table. A claimed job holds a lease
+    that a heartbeat keeps extending while it runs; if the process dies the
+    lease expires and another worker picks it up. No DB session is held while
+    waiting on the model.
+
+    The analysis a job is made from lives in llm_reports like any other and
+    the job links it through report_id; what the job itself returns (the
+    decorated analysis or the status update outcome) is kept on the job.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float, lease_seconds: int):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    async def start(self) -> None:
+        for _ in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"LLM job claim failed: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self._execute(job)
+            except Exception as e:
+                # lease expiry hands the job to the next claim
+                print(f"LLM job {job['id']} bookkeeping failed: {e}")
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(LLMJob)
+                    .where(
+                        or_(
+                            and_(LLMJob.status == JobStatus.queued, LLMJob.run_after <= func.now()),
+                            and_(LLMJob.status == JobStatus.running, LLMJob.locked_until < func.now())
+                        )
+                    )
+                    .order_by(LLMJob.run_after)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )
+                job = result.scalar_one_or_none()
+                if job is None:
+                    return None
+
+                job.status = JobStatus.running
+                job.attempts += 1
+                job.started_at = now
+                job.locked_until = now + timedelta(seconds=self.lease_seconds)
+                # plain values, the session is closed before the model is called
+                return {
+                    "id": job.id,
+                    "kind": job.kind,
+                    "project_id": job.project_id,
+                    "task_id": job.task_id,
+                    "created_by": job.created_by,
+                    "attempts": job.attempts,
+                    "max_attempts": job.max_attempts
+                }
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        # queued work yields to interactive callers, and counts against its submitter's cap
+        set_caller(Priority.background, job["created_by"])
+        run = asyncio.create_task(self._run_job(job))
+        heartbeat = asyncio.create_task(self._keep_lease(job, run))
+        try:
+            key, result = await run
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # shutting down, the lease expires and the job is claimed again
+                raise
+            print(f"LLM job {job['id']} lost its lease, another worker runs it now")
+            return
+        except Exception as e:
+            await self._fail(job, e)
+            return
+        finally:
+            heartbeat.cancel()
+
+        await self._complete(job, key, result)
+
+    async def _keep_lease(self, job: Dict[str, Any], run: asyncio.Task) -> None:
+        """
+        Extend the lease while the job runs, queueing and map-reduce rounds
+        can outlast any fixed lease. If another worker has taken the job over
+        this run is stopped, so there is no duplicate generation or status write.
+        """
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as session:
+                    result = await session.execute(
+                        update(LLMJob)
+                        .where(
+                            LLMJob.id == job["id"],
+                            LLMJob.status == JobStatus.running,
+                            LLMJob.attempts == job["attempts"]
+                        )
+                        .values(locked_until=func.now() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await session.commit()
+            except Exception as e:
+                # try again on the next beat, a third of the lease is left
+                print(f"LLM job {job['id']} lease renewal failed: {e}")
+                continue
+            if result.rowcount == 0:
+                run.cancel()
+                return
+
+    async def _run_job(self, job: Dict[str, Any]):
+        kind = job["kind"]
+
+        if kind == JobKind.analyze_task:
+            async with AsyncSessionLocal() as session:
+                task_data = await load_task_data(session, job["task_id"])
+            if task_data is None:
+                raise JobNotFoundError("Task not found")
+
+            analysis = await analyze_task(task_data)
+            analysis["current_status"] = task_data["status"]
+            analysis["task_title"] = task_data["title"]
+            analysis["subtask_count"] = len(task_data["subtasks"])
+            return analysis_key("task", task_data), analysis
+
+        async with AsyncSessionLocal() as session:
+            project_data = await load_project_data(session, job["project_id"])
+        if project_data is None:
+            raise JobNotFoundError("Project not found")
+
+        analysis = await analyze_project(project_data)
+        analysis["current_status"] = project_data["status"]
+        analysis["project_name"] = project_data["name"]
+        analysis["total_tasks"] = len(project_data["tasks"])
+
+        key = analysis_key("project", project_data)
+        if kind == JobKind.analyze_project:
+            return key, analysis
+
+        return key, await self._apply_project_status(job["project_id"], analysis)
+
+    async def _apply_project_status(self, project_id: UUID, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        recommended = analysis.get("recommended_status")
+        confidence = analysis.get("confidence", 0)
+
+        if confidence < STATUS_UPDATE_MIN_CONFIDENCE:
+            return {
+                "updated": False,
+                "reason": f"Confidence too low ({confidence:.2f})",
+                "recommendation": recommended,
+                "current_status": analysis["current_status"],
+                "completion_percentage": analysis.get("completion_percentage")
+            }
+
+        async with AsyncSessionLocal() as session:
+            project = await session.get(Project, project_id)
+            if project is None:
+                raise JobNotFoundError("Project not found")
+            old_status = project.status.value
+            project.status = Status[recommended]
+            await session.commit()
+
+        return {
+            "updated": True,
+            "old_status": old_status,
+            "new_status": recommended,
+            "confidence": confidence,
+            "reasoning": analysis.get("reasoning"),
+            "project_name": analysis["project_name"],
+            "completion_percentage": analysis.get("completion_percentage")
+        }
+
+    async def _complete(self, job: Dict[str, Any], key: str, result: Dict[str, Any]) -> None:
+        async with AsyncSessionLocal() as session:
+            db_job = await session.get(LLMJob, job["id"])
+            db_job.status = JobStatus.done
+            # link the row the analysis was stored under instead of writing a second one;
+            # rules and classifier answers are never stored, their jobs have no report
+            db_job.report_id = await find_stored_report(session, key)
+            # round-trip through JSON so datetimes and UUIDs are stored as strings
+            db_job.result = json.loads(json.dumps(result, default=str))
+            db_job.last_error = None
+            db_job.locked_until = None
+            db_job.finished_at = datetime.now(timezone.utc)
+            await session.commit()
+
+        job_notifier.notify(job["id"])
+
+    async def _fail(self, job: Dict[str, Any], error: Exception) -> None:
+        retry = not isinstance(error, JobNotFoundError) and job["attempts"] < job["max_attempts"]
+        print(f"LLM job {job['id']} attempt {job['attempts']} failed: {error}")
+
+        async with AsyncSessionLocal() as session:
+            db_job = await session.get(LLMJob, job["id"])
+            db_job.last_error = str(error)[:1000]
+            db_job.locked_until = None
+            if retry:
+                # exponential backoff between attempts
+                delay = settings.LLM_JOB_RETRY_BACKOFF_SECONDS * (2 ** (job["attempts"] - 1))
+                db_job.status = JobStatus.queued
+                db_job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            else:
+                db_job.status = JobStatus.failed
+                db_job.finished_at = datetime.now(timezone.utc)
+            await session.commit()
+
+        if not retry:
+            job_notifier.notify(job["id"])
+
+
+job_worker = JobWorker(
+    concurrency=settings.LLM_JOB_WORKERS,
+    poll_interval=settings.LLM_JOB_POLL_SECONDS,
+    lease_seconds=settings.LLM_JOB_LEASE_SECONDS
+)
@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+
+class JsonObjectScanner:
+    """
+    Find the first balanced {...} object in generated text, in one pass.
+
+    Braces inside JSON strings (and escaped quotes) are skipped, so markdown
+    fences, a leading sentence or trailing chatter around the object do not
+    matter. Text can be fed in pieces as it is generated; `feed` returns the
+    object as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._start: Optional[int] = None
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[str] = None
+
+    def feed(self, text: str) -> Optional[str]:
+        if self.result is not None:
+            return self.result
+
+        for i, ch in enumerate(text):
+            if self._start is None:
+                if ch == "{":
+                    self._start = self._position + i
+                    self._depth = 1
+                    self._buffer.append(text[i:])
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish(text, i)
+                    return self.result
+
+        if self._start is not None and self._start < self._position:
+            self._buffer.append(text)
+        self._position += len(text)
+        return None
+
+    def _finish(self, text: str, end: int) -> None:
+        start_in_text = self._start - self._position
+        if start_in_text >= 0:
+            # object opened and closed inside this piece
+            self.result = text[start_in_text:end + 1]
+        else:
+            self.result = "".join(self._buffer) + text[:end + 1]
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """First balanced JSON object in `text`, None if there is none"""
+    return JsonObjectScanner().feed(text)
@@ -0,0 +1,98 @@
+import math
+import threading
+from typing import Any, Dict, Tuple
+
+# upper bounds, milliseconds unless the histogram is a token count
+MS_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, math.inf)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, math.inf)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == math.inf else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.total, 2),
+            "mean": round(self.total / self.count, 2) if self.count else 0.0,
+            "max": round(self.max, 2),
+            "buckets": buckets
+        }
+
+
+class LLMMetrics:
+    """
+    In-process counters and histograms for the LLM path, labelled by
+    operation (project/task). Exposed as JSON on /api/mcp/metrics.
+    """
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, operation: str, amount: int = 1) -> None:
+        with self._lock:
+            key = (name, operation)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def count(self, name: str, operation: str) -> int:
+        with self._lock:
+            return self._counters.get((name, operation), 0)
+
+    def observe(self, name: str, operation: str, value: float) -> None:
+        """Record one sample; names ending in _tokens get token-count buckets"""
+        with self._lock:
+            key = (name, operation)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                buckets = TOKEN_BUCKETS if name.endswith("_tokens") else MS_BUCKETS
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters: Dict[str, Dict[str, int]] = {}
+            for (name, operation), value in sorted(self._counters.items()):
+                counters.setdefault(name, {})[operation] = value
+            histograms: Dict[str, Dict[str, Any]] = {}
+            for (name, operation), histogram in sorted(self._histograms.items()):
+                histograms.setdefault(name, {})[operation] = histogram.to_dict()
+
+        parse_failure_rate = {}
+        for operation, total in counters.get("parse_total", {}).items():
+            failures = counters.get("parse_failures", {}).get(operation, 0)
+            parse_failure_rate[operation] = round(failures / total, 4) if total else 0.0
+
+        return {
+            "counters": counters,
+            "histograms": histograms,
+            "parse_failure_rate": parse_failure_rate
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+llm_metrics = LLMMetrics()
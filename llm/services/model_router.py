@@ -0,0 +1,121 @@
+import math
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.config import settings
+from llm.services.llm_metrics import llm_metrics
+
+# route template of the current request (e.g. /api/mcp/analyze-task/{task_id}), set by the routes
+_caller_route: ContextVar[Optional[str]] = ContextVar("llm_caller_route", default=None)
+
+
+def set_route(route: Optional[str]) -> None:
+    _caller_route.set(route)
+
+
+def status_entropy(statuses: Iterable[str]) -> float:
+    """Shannon entropy of a status distribution in bits, 0 when every item agrees"""
+    counts = Counter(statuses)
+    total = sum(counts.values())
+    if not total:
+        return 0.0
+    return -sum(count / total * math.log2(count / total) for count in counts.values())
+
+
+def parse_overrides(raw: str) -> Dict[str, str]:
+    """Parse "key=target" pairs separated by commas, e.g. "project_chunk=small" """
+    overrides = {}
+    for pair in raw.split(","):
+        key, sep, target = pair.partition("=")
+        if sep and key.strip() and target.strip():
+            overrides[key.strip()] = target.strip()
+    return overrides
+
+
+class ModelRouter:
+    """
+    Picks the model for each LLM call.
+
+    Small, clear-cut inputs (few tasks and subtasks, statuses mostly agreeing)
+    go to the fast small model, everything else to the large one. An override
+    for the request's route, or failing that for the operation, wins over the
+    size rules; its target is "small", "large" or a model name. Without a
+    small model configured every call goes to the large model.
+    """
+
+    def __init__(
+            self,
+            large_model: str,
+            small_model: str,
+            max_tasks: int,
+            max_subtasks: int,
+            max_entropy: float,
+            overrides: Dict[str, str]
+    ):
+        self.large_model = large_model
+        self.small_model = small_model or None
+        self.max_tasks = max_tasks
+        self.max_subtasks = max_subtasks
+        self.max_entropy = max_entropy
+        self.overrides = overrides
+
+    @property
+    def models(self) -> List[str]:
+        """Models to keep warm"""
+        return [model for model in (self.large_model, self.small_model) if model]
+
+    def choose(self, operation: str, data: Dict[str, Any]) -> str:
+        """Model for one call; `data` is a project (tasks) or a task (subtasks) snapshot"""
+        override = self.overrides.get(_caller_route.get() or "") or self.overrides.get(operation)
+        if override is not None:
+            return self._resolve(override)
+        if self.small_model is None:
+            return self.large_model
+        return self.small_model if self._is_small(data) else self.large_model
+
+    def record(self, operation: str, model: str) -> None:
+        """Count a call actually sent to `model`"""
+        llm_metrics.increment("routed_small" if model == self.small_model else "routed_large", operation)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "large_model": self.large_model,
+            "small_model": self.small_model,
+            "max_tasks": self.max_tasks,
+            "max_subtasks": self.max_subtasks,
+            "max_entropy": self.max_entropy,
+            "overrides": self.overrides
+        }
+
+    def _resolve(self, target: str) -> str:
+        if target == "large":
+            return self.large_model
+        if target == "small":
+            return self.small_model or self.large_model
+        return target
+
+    def _is_small(self, data: Dict[str, Any]) -> bool:
+        tasks = data.get("tasks")
+        if tasks is not None:
+            subtask_count = sum(len(task.get("subtasks") or []) for task in tasks)
+            statuses = [task.get("status", "to_do") for task in tasks]
+            if len(tasks) > self.max_tasks:
+                return False
+        else:
+            subtasks = data.get("subtasks") or []
+            subtask_count = len(subtasks)
+            statuses = [subtask.get("status", "to_do") for subtask in subtasks]
+
+        # an even spread over statuses is where the judgement call is hard
+        return subtask_count <= self.max_subtasks and status_entropy(statuses) <= self.max_entropy
+
+
+model_router = ModelRouter(
+    large_model=settings.OLLAMA_MODEL,
+    small_model=settings.LLM_SMALL_MODEL,
+    max_tasks=settings.LLM_SMALL_MODEL_MAX_TASKS,
+    max_subtasks=settings.LLM_SMALL_MODEL_MAX_SUBTASKS,
+    max_entropy=settings.LLM_SMALL_MODEL_MAX_ENTROPY,
+    overrides=parse_overrides(settings.LLM_MODEL_OVERRIDES)
+)
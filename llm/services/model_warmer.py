@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from core.config import settings
+from llm.services.qwen_service_ollama import qwen_service
+from llm.services.model_router import model_router
+
+
+class ModelWarmer:
+    """
+    Keeps the models loaded on the Ollama side.
+
+    On startup it issues one warm-up call per backend and routed model in the
+    background, so the first real analysis does not pay the model load. With
+    the heartbeat enabled it repeats the warm-up every `interval` seconds
+    during business hours, skipping ticks where real traffic already kept the
+    models resident.
+    """
+
+    def __init__(
+            self,
+            warm_on_startup: bool,
+            heartbeat: bool,
+            interval: float,
+            start_hour: int,
+            end_hour: int,
+            weekdays_only: bool
+    ):
+        self.warm_on_startup = warm_on_startup
+        self.heartbeat = heartbeat
+        self.interval = interval
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.weekdays_only = weekdays_only
+        self._task: Optional[asyncio.Task] = None
+        self._seen_requests = 0
+
+    async def start(self) -> None:
+        if (self.warm_on_startup or self.heartbeat) and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def in_business_hours(self, now: datetime) -> bool:
+        if self.weekdays_only and now.weekday() >= 5:
+            return False
+        return self.start_hour <= now.hour < self.end_hour
+
+    async def _run(self) -> None:
+        if self.warm_on_startup:
+            await self._warm_up("startup")
+
+        if not self.heartbeat or self.interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.in_business_hours(datetime.now()):
+                continue
+            requests = sum(backend.requests for backend in qwen_service.backends.backends)
+            if requests != self._seen_requests:
+                # analyses since the last tick already refreshed keep_alive
+                self._seen_requests = requests
+                continue
+            await self._warm_up("heartbeat")
+
+    async def _warm_up(self, reason: str) -> None:
+        try:
+            warmed = await qwen_service.warm_up()
+        except Exception as e:
+            print(f"Ollama {reason} warm-up failed: {e}")
+            return
+        total = len(qwen_service.backends.backends) * len(model_router.models)
+        print(f"Ollama {reason} warm-up: {warmed}/{total} backend models ready")
+
+
+model_warmer = ModelWarmer(
+    warm_on_startup=settings.OLLAMA_WARMUP_ON_STARTUP,
+    heartbeat=settings.OLLAMA_HEARTBEAT_ENABLED,
+    interval=settings.OLLAMA_HEARTBEAT_SECONDS,
+    start_hour=settings.OLLAMA_HEARTBEAT_START_HOUR,
+    end_hour=settings.OLLAMA_HEARTBEAT_END_HOUR,
+    weekdays_only=settings.OLLAMA_HEARTBEAT_WEEKDAYS_ONLY
+)
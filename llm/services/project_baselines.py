@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from cachetools import TTLCache
+
+from core.config import settings
+
+# the parts of the previous answer a delta prompt carries forward
+CARRIED_FIELDS = ("recommended_status", "confidence", "completion_percentage", "risk_level", "reasoning")
+
+
+def task_state(task: Dict[str, Any]) -> Dict[str, Any]:
+    subtasks = task.get("subtasks") or []
+    return {
+        "title": task.get("title"),
+        "status": task.get("status", "to_do"),
+        "subtasks_done": sum(1 for subtask in subtasks if subtask.get("status") == "done"),
+        "subtasks_total": len(subtasks)
+    }
+
+
+class ProjectBaselines:
+    """
+    Last LLM analysis per project together with the task states it saw.
+
+    A later analysis of the same project can then send the previous answer
+    and only the tasks that changed since, instead of the whole project.
+    `chain` counts deltas since the last full analysis so the caller can
+    force a full one before small errors pile up. Bounded LRU+TTL like the
+    analysis cache; a missing baseline just means a full prompt.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, project_id: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(str(project_id))
+
+    def remember(
+            self,
+            project_data: Dict[str, Any],
+            analysis: Dict[str, Any],
+            delta: bool
+    ) -> None:
+        previous = self.get(project_data["id"]) if delta else None
+        baseline = {
+            "tasks": {str(task.get("id")): task_state(task) for task in project_data.get("tasks", [])},
+            "analysis": {field: analysis.get(field) for field in CARRIED_FIELDS},
+            "chain": previous["chain"] + 1 if previous else 0
+        }
+        with self._lock:
+            self._entries[str(project_data["id"])] = baseline
+
+    def changes(self, baseline: Dict[str, Any], project_data: Dict[str, Any]) -> List[str]:
+        """One line per task added, removed or changed since the baseline"""
+        before = baseline["tasks"]
+        lines = []
+        seen = set()
+        for task in project_data.get("tasks", []):
+            task_id = str(task.get("id"))
+            seen.add(task_id)
+            now = task_state(task)
+            old = before.get(task_id)
+            if old is None:
+                lines.append(
+                    f"+ {now['title']}: {now['status']} "
+                    f"(subtasks {now['subtasks_done']}/{now['subtasks_total']} done, new task)"
+                )
+            elif old != now:
+                lines.append(
+                    f"* {now['title']}: {old['status']} -> {now['status']}, "
+                    f"subtasks {old['subtasks_done']}/{old['subtasks_total']} -> "
+                    f"{now['subtasks_done']}/{now['subtasks_total']} done"
+                )
+        for task_id, old in before.items():
+            if task_id not in seen:
+                lines.append(f"- {old['title']}: removed (was {old['status']})")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+project_baselines = ProjectBaselines(
+    maxsize=settings.LLM_DELTA_BASELINE_MAXSIZE,
+    ttl=settings.LLM_DELTA_BASELINE_TTL_SECONDS
+)
@@ -0,0 +1,149 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+STATUSES = ("to_do", "in_progress", "review", "done")
+
+# rough chars-per-token ratio for Qwen's tokenizer on English/JSON text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap prompt size estimate, good enough to budget prefill"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_tasks(tasks: List[Dict[str, Any]], token_budget: int) -> str:
+    """
+    Format task lines for the project prompt within a token budget.
+
+    Tasks are ranked by how much they tell the model (overdue, in progress,
+    subtasks not started under a task that has moved on), listed in that
+    order while the budget lasts, and the rest are collapsed into one
+    aggregate line.
+    """
+    if not tasks:
+        return "no tasks"
+
+    now = datetime.now(timezone.utc)
+    ranked = sorted(tasks, key=lambda task: _task_signal(task, now), reverse=True)
+
+    lines: List[str] = []
+    used = 0
+    listed = 0
+    for task in ranked:
+        line = _format_task_line(listed + 1, task, now)
+        cost = estimate_tokens(line) + 1
+        # always keep room for the aggregate line of what is left out
+        if used + cost > token_budget - 40 and listed < len(tasks) - 1:
+            break
+        lines.append(line)
+        used += cost
+        listed += 1
+
+    rest = ranked[listed:]
+    if rest:
+        lines.append(_aggregate_line(rest, now, "tasks"))
+    return "\n".join(lines)
+
+
+def compact_subtasks(subtasks: List[Dict[str, Any]], token_budget: int) -> str:
+    """Format subtask lines within a token budget, unfinished ones first"""
+    if not subtasks:
+        return "no subtasks"
+
+    order = {"in_progress": 0, "review": 1, "to_do": 2, "done": 3}
+    ranked = sorted(subtasks, key=lambda subtask: order.get(subtask.get("status"), 2))
+
+    lines: List[str] = []
+    used = 0
+    for i, subtask in enumerate(ranked, 1):
+        line = f"{i}. {subtask.get('title')}-{subtask.get('status')}"
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget - 30 and i < len(ranked):
+            break
+        lines.append(line)
+        used += cost
+
+    rest = ranked[len(lines):]
+    if rest:
+        lines.append(_aggregate_line(rest, None, "subtasks"))
+    return "\n".join(lines)
+
+
+def status_counts(items: List[Dict[str, Any]]) -> Dict[str, int]:
+    counts = {status: 0 for status in STATUSES}
+    for item in items:
+        status = item.get("status", "to_do")
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def is_overdue(task: Dict[str, Any], now: datetime) -> bool:
+    if task.get("status") == "done":
+        return False
+    deadline = _parse_deadline(task.get("deadline"))
+    return deadline is not None and deadline < now
+
+
+def _task_signal(task: Dict[str, Any], now: datetime) -> int:
+    status = task.get("status", "to_do")
+    score = 0
+    if is_overdue(task, now):
+        score += 4
+    if status == "in_progress":
+        score += 3
+    elif status == "review":
+        score += 1
+    score += min(_stuck_subtasks(task), 3)
+    return score
+
+
+def _stuck_subtasks(task: Dict[str, Any]) -> int:
+    """Subtasks still in to_do under a task that is already in progress or later"""
+    if task.get("status", "to_do") == "to_do":
+        return 0
+    return sum(1 for subtask in task.get("subtasks", []) if subtask.get("status", "to_do") == "to_do")
+
+
+def _format_task_line(position: int, task: Dict[str, Any], now: datetime) -> str:
+    subtasks = task.get("subtasks", [])
+    done = sum(1 for subtask in subtasks if subtask.get("status") == "done")
+    line = (
+        f"{position}.{task.get('title')} -Status: {task.get('status')}"
+        f"(Subtasks:{len(subtasks)}, done:{done})"
+    )
+    flags = []
+    if is_overdue(task, now):
+        flags.append("OVERDUE")
+    stuck = _stuck_subtasks(task)
+    if stuck:
+        flags.append(f"{stuck} subtasks not started")
+    if flags:
+        line += f" [{', '.join(flags)}]"
+    return line
+
+
+def _aggregate_line(items: List[Dict[str, Any]], now: Optional[datetime], label: str) -> str:
+    counts = status_counts(items)
+    parts = [f"{status} {count}" for status, count in counts.items() if count]
+    line = f".. and {len(items)} more {label}: {', '.join(parts)}"
+    if now is not None:
+        overdue = sum(1 for item in items if is_overdue(item, now))
+        if overdue:
+            line += f"; {overdue} overdue"
+    return line
+
+
+def _parse_deadline(value: Any) -> Optional[datetime]:
+    if not value or value == "None":
+        return None
+    if isinstance(value, datetime):
+        deadline = value
+    else:
+        try:
+            deadline = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    return deadline
@@ -1,16 +1,319 @@
+import asyncio
 import httpx
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from fastapi import HTTPException
 import json
+import textwrap
+import time
 from core.config import settings
+from llm.services.circuit_breaker import OllamaUnavailableError
+from llm.services.backend_pool import BackendPool, OllamaBackend
+from llm.services.admission import admission, AdmissionRejected
+from llm.services.model_router import model_router
+from llm.services.status_classifier import status_classifier, snapshot_counts
+from llm.services.project_baselines import project_baselines
+from llm.services.prompt_compaction import (
+    STATUSES,
+    estimate_tokens,
+    compact_tasks,
+    compact_subtasks,
+)
+from llm.services.json_extract import extract_json_object, JsonObjectScanner
+from llm.services.llm_metrics import llm_metrics
+
+# bump whenever the prompts change so cached analyses are not reused
+PROMPT_VERSION = "v4"
+
+PROJECT_SYSTEM_PROMPT = "You are aproject management expert. Analyze task statuses and provide status recommendations in JSON format only.Always respond with valid JSON"
+TASK_SYSTEM_PROMPT = "Respond only with valid JSON. No markdown formatting."
+
+TASK_PROMPT_TEMPLATE = textwrap.dedent("""
+    Analyze this task and its subtasks to determine the appropriate status.
+
+    Task: {title}
+    Current Status: {status}
+    Total Subtasks: {total}
+
+    Subtask Statuses:
+    {subtasks}
+
+    Rules:
+    - If all subtasks are "done", task should be "done"
+    - If majority are "in_progress", task should be "in_progress"
+    - If most are "to_do", task should be "to_do"
+    - If any are "in_progress" and some "done", task should be "in_progress"
+    - Consider "review" status for completed but unverified work
+
+    Respond with JSON only (no markdown, no explanation):
+    {{
+        "recommended_status": "to_do|in_progress|review|done",
+        "confidence": 0.0-1.0,
+        "reasoning": "brief explanation",
+        "completion_percentage": 0-100
+    }}
+""").strip()
+
+PROJECT_PROMPT_TEMPLATE = textwrap.dedent("""
+    Analyze this project and recommend an overall status.
+
+    Project: {name}
+    Current Status: {status}
+    Deadline: {deadline}
+    Total Tasks: {total}
+
+    Task Status Summary:
+    {summary}
+
+    Detailed Task Information:
+    {details}
+
+    Please analyze and respond with JSON only (no markdown, no code blocks):
+    {{
+        "recommended_status": "to_do|in_progress|review|done",
+        "confidence": 0.0-1.0,
+        "reasoning": "detailed explanation",
+        "risk_level": "low|medium|high",
+        "completion_percentage": 0-100,
+        "recommendations": ["action item 1", "action item 2"]
+    }}
+""").strip()
+
+# delta mode: the previous answer plus only what changed since it
+DELTA_PROMPT_TEMPLATE = textwrap.dedent("""
+    Update your previous analysis of this project.
+    Only the tasks listed under Changes have changed since then.
+
+    Project: {name}
+    Current Status: {status}
+    Deadline: {deadline}
+    Total Tasks: {total}
+
+    Task Status Summary:
+    {summary}
+
+    Previous Analysis:
+    - recommended_status: {previous_status}
+    - confidence: {previous_confidence}
+    - completion_percentage: {previous_completion}
+    - risk_level: {previous_risk}
+    - reasoning: {previous_reasoning}
+
+    Changes ({count}):
+    {changes}
+
+    Please analyze and respond with JSON only (no markdown, no code blocks):
+    {{
+        "recommended_status": "to_do|in_progress|review|done",
+        "confidence": 0.0-1.0,
+        "reasoning": "detailed explanation",
+        "risk_level": "low|medium|high",
+        "completion_percentage": 0-100,
+        "recommendations": ["action item 1", "action item 2"]
+    }}
+""").strip()
+
+# map-reduce for large projects: slices are summarized first, then combined
+CHUNK_SYSTEM_PROMPT = "You summarize a slice of a project's tasks for a later overall assessment. Respond only with valid JSON."
+
+CHUNK_PROMPT_TEMPLATE = textwrap.dedent("""
+    Summarize this slice of the tasks of project {name} (tasks {first}-{last} of {total}).
+
+    Slice Status Summary:
+    {summary}
+
+    Tasks:
+    {details}
+
+    Respond with JSON only (no markdown, no explanation):
+    {{
+        "completion_percentage": 0-100,
+        "risk_level": "low|medium|high",
+        "blockers": ["short description"],
+        "summary": "one or two sentences"
+    }}
+""").strip()
+
+REDUCE_PROMPT_TEMPLATE = textwrap.dedent("""
+    Analyze this project and recommend an overall status.
+    The project is large, so its tasks were summarized in {chunks} slices first.
+
+    Project: {name}
+    Current Status: {status}
+    Deadline: {deadline}
+    Total Tasks: {total}
+
+    Task Status Summary:
+    {summary}
+
+    Slice Summaries:
+    {slices}
+
+    Please analyze and respond with JSON only (no markdown, no code blocks):
+    {{
+        "recommended_status": "to_do|in_progress|review|done",
+        "confidence": 0.0-1.0,
+        "reasoning": "detailed explanation",
+        "risk_level": "low|medium|high",
+        "completion_percentage": 0-100,
+        "recommendations": ["action item 1", "action item 2"]
+    }}
+""").strip()
+
+# JSON schemas of the expected answers, sent as a decoding constraint
+TASK_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommended_status": {"type": "string", "enum": list(STATUSES)},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+        "reasoning": {"type": "string"},
+        "completion_percentage": {"type": "number", "minimum": 0, "maximum": 100}
+    },
+    "required": ["recommended_status", "confidence", "reasoning", "completion_percentage"]
+}
+
+PROJECT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **TASK_RESPONSE_SCHEMA["properties"],
+        "risk_level": {"type": "string", "enum": ["low", "medium", "high"]},
+        "recommendations": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": TASK_RESPONSE_SCHEMA["required"] + ["risk_level", "recommendations"]
+}
+
+CHUNK_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "completion_percentage": {"type": "number", "minimum": 0, "maximum": 100},
+        "risk_level": {"type": "string", "enum": ["low", "medium", "high"]},
+        "blockers": {"type": "array", "items": {"type": "string"}},
+        "summary": {"type": "string"}
+    },
+    "required": ["completion_percentage", "risk_level", "blockers", "summary"]
+}
+
+RESPONSE_SCHEMAS = {
+    "project": PROJECT_RESPONSE_SCHEMA,
+    "project_chunk": CHUNK_RESPONSE_SCHEMA,
+    "task": TASK_RESPONSE_SCHEMA
+}
+
+# fields of the final native /api/chat chunk that telemetry reads
+STREAM_STATS_FIELDS = (
+    "prompt_eval_count",
+    "eval_count",
+    "load_duration",
+    "prompt_eval_duration",
+    "eval_duration",
+    "total_duration"
+)
 
 class QwenService:
     def __init__(self):
-        self.base_url = settings.OLLAMA_BASE_URL
+        # comma separated for several Ollama hosts, all with the same API flavour
+        self.base_urls = [url.strip() for url in settings.OLLAMA_BASE_URL.split(",") if url.strip()]
+        self.base_url = self.base_urls[0]
+        # native /api/chat reports prompt/eval durations, the OpenAI endpoint only token counts
+        self.native_api = self.base_url.rstrip("/").endswith("/api/chat")
+        # the large model; small, clear-cut inputs may be routed to LLM_SMALL_MODEL
         self.model = settings.OLLAMA_MODEL
         self.api_key = settings.OLLAMA_API_KEY
         self.timeout = settings.OLLAMA_TIMEOUT
+        # shared pooled client, opened/closed by the app lifespan in main.py
+        self.client: Optional[httpx.AsyncClient] = None
+        self.backends = BackendPool(
+            self.base_urls,
+            failure_threshold=settings.OLLAMA_BREAKER_FAILURE_THRESHOLD,
+            eject_seconds=settings.OLLAMA_BREAKER_RECOVERY_SECONDS,
+            hedge_percentile=settings.OLLAMA_HEDGE_PERCENTILE if settings.OLLAMA_HEDGE_ENABLED else None,
+            hedge_min_samples=settings.OLLAMA_HEDGE_MIN_SAMPLES
+        )
+
+    async def startup(self) -> None:
+        """Open the shared Ollama HTTP client"""
+        if self.client is None:
+            self.client = self._create_client()
+
+    async def shutdown(self) -> None:
+        """Close the shared Ollama HTTP client and its pooled connections"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY
+        )
+        http2 = settings.OLLAMA_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("OLLAMA_HTTP2 is enabled but 'h2' is not installed, using HTTP/1.1")
+                http2 = False
+
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=http2,
+            timeout=self.timeout,
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+    async def warm_up(self) -> int:
+        """
+        Load every routed model on every backend and refresh its keep_alive.
+        Returns how many backend/model pairs answered.
+        """
+        results = await asyncio.gather(
+            *(
+                self._warm_up_backend(backend, model)
+                for backend in self.backends.backends
+                for model in model_router.models
+            )
+        )
+        return sum(results)
+
+    async def _warm_up_backend(self, backend: OllamaBackend, model: str) -> bool:
+        if self.native_api:
+            # a chat with no messages only loads the model
+            payload = {"model": model, "messages": []}
+        else:
+            payload = {
+                "model": model,
+                "messages": [{"role": "user", "content": "ok"}],
+                "max_tokens": 1,
+                "stream": False
+            }
+        if settings.OLLAMA_KEEP_ALIVE:
+            payload["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
+
+        started = time.perf_counter()
+        try:
+            response = await self._get_client().post(backend.url, json=payload, timeout=self.timeout)
+        except httpx.HTTPError as e:
+            print(f"Ollama warm-up of {model} on {backend.url} failed: {e}")
+            return False
+        if response.status_code != 200:
+            print(f"Ollama warm-up of {model} on {backend.url} failed: HTTP {response.status_code}")
+            return False
+
+        llm_metrics.observe("llm_warm_up_ms", "warm_up", (time.perf_counter() - started) * 1000)
+        return True
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # scripts and tests may use the service without the app lifespan
+        if self.client is None:
+            self.client = self._create_client()
+        return self.client
+
+    def model_for(self, operation: str, data: Dict[str, Any]) -> str:
+        """Model that answers `operation` for this snapshot, part of the cache key"""
+        return model_router.choose(operation, data)
 
     
     async def calculate_project_status(
@@ -26,48 +329,160 @@ class QwenService:
         Returns:
             Dictionary with recommended status and reasoning
         """
-
-        prompt = self._build_status_prompt(project_data)
         try:
-            async with httpx.AsyncClient() as client:
-                response=await client.post(
-                    self.base_url,
-                    headers={
-                        "Content-Type":"application/json"
-                    },
-                    json={
-                        "model":self.model,
-                        "messages": [
-                            {
-                            "role":"system",
-                            "content":"You are aproject management expert. Analyze task statuses and provide status recommendations in JSON format only.Always respond with valid JSON"
-                            },
-                            {
-                                "role":"user",
-                                "content":prompt
-                            }
-                        ],
-                        "temperature":0.3,
-                        "stream":False
-                    },
-                    timeout=self.timeout
-                )
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"Ollama api error :{response.text}"
-                    )
-                result = response.json()
-                analysis=self._parse_ollama_response(result)
-                return analysis
+            # a small change to an analyzed project only needs the change sent
+            prompt = self._build_delta_prompt(project_data)
+            delta = prompt is not None
+            if not delta:
+                if len(project_data.get("tasks", [])) >= settings.LLM_MAP_REDUCE_MIN_TASKS:
+                    analysis = await self._map_reduce_project(project_data)
+                    self._remember_analysis(project_data, analysis, delta=False)
+                    return analysis
+                prompt = self._build_status_prompt(project_data)
+
+            model = self.model_for("project", project_data)
+            result, telemetry = await self._post_chat(PROJECT_SYSTEM_PROMPT, prompt, "project", model)
+            analysis=self._parse_ollama_response(result, "project")
+            analysis["model"] = model
+            analysis["prompt_tokens_estimate"] = estimate_tokens(prompt)
+            telemetry["prompt_mode"] = "delta" if delta else "full"
+            analysis["telemetry"] = telemetry
+            self._remember_analysis(project_data, analysis, delta)
+            return analysis
             
+        except OllamaUnavailableError:
+            return self._fallback_status_calculation_project(project_data)
         except httpx.TimeoutException:
             print("Ollama timeout, using fallback calculation")
             return self._fallback_status_calculation_project(project_data)
         except httpx.RequestError as e:
             print(f"Ollama connection error {e}, using fallback ")
             return self._fallback_status_calculation_project(project_data)
+        except httpx.HTTPError as e:
+            # 5xx answers, also raised from the streamed path
+            print(f"Ollama error {e}, using fallback")
+            return self._fallback_status_calculation_project(project_data)
     
+    async def _map_reduce_project(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analyze a large project in two steps: slices of tasks are summarized
+        concurrently, then one reduce prompt judges the whole project from the
+        exact status counts and the slice summaries. Every task is seen by the
+        model and each prompt stays within the token budget.
+        """
+        tasks = project_data.get("tasks", [])
+        size = max(1, settings.LLM_MAP_REDUCE_CHUNK_SIZE)
+        chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+        semaphore = asyncio.Semaphore(settings.LLM_MAP_REDUCE_CONCURRENCY)
+
+        async def summarize(index: int, chunk: List[Dict[str, Any]]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._summarize_chunk(project_data, chunk, index * size + 1)
+
+        started = time.perf_counter()
+        summaries = await asyncio.gather(*(summarize(i, chunk) for i, chunk in enumerate(chunks)))
+        map_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        model = self.model_for("project", project_data)
+        prompt = self._build_reduce_prompt(project_data, summaries)
+        try:
+            result, telemetry = await self._post_chat(PROJECT_SYSTEM_PROMPT, prompt, "project", model)
+        except (OllamaUnavailableError, httpx.HTTPError) as e:
+            print(f"Ollama error on the reduce step: {e}, using fallback")
+            return self._fallback_status_calculation_project(project_data)
+        analysis = self._parse_ollama_response(result, "project")
+        analysis["model"] = model
+        analysis["prompt_tokens_estimate"] = estimate_tokens(prompt)
+        telemetry["map_reduce"] = {
+            "chunks": len(chunks),
+            "chunk_fallbacks": sum(1 for summary in summaries if summary.get("fallback")),
+            "map_ms": map_ms
+        }
+        analysis["telemetry"] = telemetry
+        return analysis
+
+    async def _summarize_chunk(
+            self,
+            project_data: Dict[str, Any],
+            chunk: List[Dict[str, Any]],
+            first: int
+    ) -> Dict[str, Any]:
+        fields = {
+            "name": project_data.get('name'),
+            "first": first,
+            "last": first + len(chunk) - 1,
+            "total": len(project_data.get("tasks", [])),
+            "summary": self._summarize_tasks(chunk)
+        }
+        skeleton = CHUNK_PROMPT_TEMPLATE.format(details="", **fields)
+        budget = settings.LLM_PROMPT_TOKEN_BUDGET - estimate_tokens(skeleton)
+        prompt = CHUNK_PROMPT_TEMPLATE.format(details=compact_tasks(chunk, budget), **fields)
+
+        summary = None
+        try:
+            model = self.model_for("project_chunk", {"tasks": chunk})
+            result, _ = await self._post_chat(CHUNK_SYSTEM_PROMPT, prompt, "project_chunk", model)
+            summary = self._parse_chunk_summary(result)
+        except (OllamaUnavailableError, httpx.HTTPError, HTTPException) as e:
+            print(f"Ollama error on tasks {fields['first']}-{fields['last']}: {e}, using rule-based slice summary")
+
+        if summary is None:
+            # the reduce step still gets this slice, just summarized by rules
+            done = sum(1 for task in chunk if task.get("status") == "done")
+            summary = {
+                "completion_percentage": round(done / len(chunk) * 100),
+                "risk_level": "medium",
+                "blockers": [],
+                "summary": "status counts only",
+                "fallback": True
+            }
+        summary["first"] = fields["first"]
+        summary["last"] = fields["last"]
+        return summary
+
+    def _parse_chunk_summary(self, response_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        llm_metrics.increment("parse_total", "project_chunk")
+        raw = extract_json_object(self._response_content(response_data))
+        try:
+            summary = json.loads(raw) if raw is not None else None
+        except json.JSONDecodeError:
+            summary = None
+        if not isinstance(summary, dict):
+            llm_metrics.increment("parse_failures", "project_chunk")
+            return None
+        return summary
+
+    def _build_reduce_prompt(self, project_data: Dict[str, Any], summaries: List[Dict[str, Any]]) -> str:
+        tasks = project_data.get("tasks", [])
+        fields = {
+            "name": project_data.get('name'),
+            "status": project_data.get('status'),
+            "deadline": project_data.get('deadline'),
+            "total": len(tasks),
+            "summary": self._summarize_tasks(tasks),
+            "chunks": len(summaries)
+        }
+        skeleton = REDUCE_PROMPT_TEMPLATE.format(slices="", **fields)
+        budget = settings.LLM_PROMPT_TOKEN_BUDGET - estimate_tokens(skeleton)
+        # share the budget evenly so no slice is dropped
+        max_chars = max(80, budget * 4 // max(1, len(summaries)))
+
+        lines = []
+        for summary in summaries:
+            blockers = ", ".join(str(blocker) for blocker in summary.get("blockers") or [])
+            line = (
+                f"Tasks {summary['first']}-{summary['last']}: "
+                f"{summary.get('completion_percentage')}% complete, risk {summary.get('risk_level')}. "
+                f"{summary.get('summary', '')}"
+            )
+            if blockers:
+                line += f" Blockers: {blockers}"
+            if summary.get("fallback"):
+                line += " (rule-based)"
+            lines.append(line[:max_chars])
+
+        return REDUCE_PROMPT_TEMPLATE.format(slices="\n".join(lines), **fields)
+
     async def calculate_task_status_from_subtask(
             self,
             task_data: Dict[str,Any]
@@ -81,95 +496,645 @@ class QwenService:
         Returns:
             Dictionary with recommended task status
         """
-        prompt = f"""
-        Analyze this task and its subtasks to determine the appropriate status.
-
-        Task: {task_data.get('title')}
-        Current Status: {task_data.get('status')}
-        Total Subtasks: {len(task_data.get('subtasks', []))}
-
-        Subtask Statuses:
-        {self._format_subtasks(task_data.get('subtasks', []))}
-
-        Rules:
-        - If all subtasks are "done", task should be "done"
-        - If majority are "in_progress", task should be "in_progress"
-        - If most are "to_do", task should be "to_do"
-        - If any are "in_progress" and some "done", task should be "in_progress"
-        - Consider "review" status for completed but unverified work
-
-        Respond with JSON only (no markdown, no explanation):
-        {{
-            "recommended_status": "to_do|in_progress|review|done",
-            "confidence": 0.0-1.0,
-            "reasoning": "brief explanation",
-            "completion_percentage": 0-100
-        }}
-        """
+        model = self.model_for("task", task_data)
+        prompt = self._build_task_prompt(task_data)
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "Respond only with valid JSON. No markdown formatting."
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.3,
-                        "stream": False
-                    },
-                    timeout=self.timeout
-                )
-                
-                result = response.json()
-                return self._parse_ollama_response(result)
+            result, telemetry = await self._post_chat(TASK_SYSTEM_PROMPT, prompt, "task", model)
+            analysis = self._parse_ollama_response(result, "task")
+            analysis["model"] = model
+            analysis["prompt_tokens_estimate"] = estimate_tokens(prompt)
+            analysis["telemetry"] = telemetry
+            return analysis
                 
+        except AdmissionRejected:
+            # load shedding is the caller's answer, not a reason to guess
+            raise
         except Exception as e:
             print(f"⚠️  Ollama error: {e}, using fallback")
             return self._fallback_status_calculation(task_data)
+
+    async def stream_project_status(
+            self,
+            project_data: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a project analysis as Ollama generates it
+
+        Yields {"event": "token", "data": {...}} for every generated piece of
+        text and finishes with one {"event": "result", "data": analysis}.
+        """
+        prompt = self._build_delta_prompt(project_data)
+        delta = prompt is not None
+        if not delta:
+            prompt = self._build_status_prompt(project_data)
+        async for event in self._stream_analysis(
+            PROJECT_SYSTEM_PROMPT,
+            prompt,
+            "project",
+            self.model_for("project", project_data),
+            lambda: self._fallback_status_calculation_project(project_data)
+        ):
+            if event["event"] == "result":
+                self._remember_analysis(project_data, event["data"], delta)
+            yield event
+
+    async def stream_task_status(
+            self,
+            task_data: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a task analysis, same event shape as stream_project_status"""
+        prompt = self._build_task_prompt(task_data)
+        async for event in self._stream_analysis(
+            TASK_SYSTEM_PROMPT,
+            prompt,
+            "task",
+            self.model_for("task", task_data),
+            lambda: self._fallback_status_calculation(task_data)
+        ):
+            yield event
+
+    async def _stream_analysis(
+            self,
+            system_prompt: str,
+            prompt: str,
+            operation: str,
+            model: str,
+            fallback
+    ) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async with admission.slot():
+                async for event in self._stream_from_backend(system_prompt, prompt, operation, model, fallback):
+                    yield event
+        except AdmissionRejected:
+            # the SSE response has already started, shed to the rule-based answer
+            yield {"event": "result", "data": fallback()}
+
+    async def _stream_from_backend(
+            self,
+            system_prompt: str,
+            prompt: str,
+            operation: str,
+            model: str,
+            fallback
+    ) -> AsyncIterator[Dict[str, Any]]:
+        backend = self.backends.acquire()
+        if backend is None:
+            yield {"event": "result", "data": fallback()}
+            return
+
+        content_parts: List[str] = []
+        stats: Dict[str, Any] = {}
+        started = time.perf_counter()
+        marks: Dict[str, float] = {}
+        backend.start()
+        try:
+            client = self._get_client()
+            async with client.stream(
+                "POST",
+                backend.url,
+                json=self._chat_payload(system_prompt, prompt, operation, model, stream=True),
+                timeout=self.timeout,
+                extensions={"trace": self._trace(marks)}
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise httpx.HTTPStatusError(
+                        f"Ollama api error :{body[:200]!r}",
+                        request=response.request,
+                        response=response
+                    )
+                async for piece in self._stream_pieces(response, operation, marks, stats):
+                    content_parts.append(piece)
+                    yield {"event": "token", "data": {"content": piece}}
+
+        except httpx.HTTPError as e:
+            # same as _send: only 5xx and transport errors count towards ejection
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                backend.breaker.record_success()
+            else:
+                backend.breaker.record_failure(type(e).__name__)
+            print(f"Ollama streaming error {e} from {backend.url}, using fallback")
+            yield {"event": "result", "data": fallback()}
+            return
+        except BaseException:
+            backend.breaker.release_probe()
+            raise
+        finally:
+            backend.finish()
+
+        backend.breaker.record_success()
+        response_data = self._streamed_body(model, content_parts, stats)
+        self._record_telemetry(operation, self._telemetry(started, marks, response_data, backend))
+
+        analysis = self._parse_content("".join(content_parts), operation)
+        analysis["model"] = model
+        yield {"event": "result", "data": analysis}
+
+    def fast_answer(self, kind: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Rules answer for a uniform status distribution, else the classifier's
+        when it is confident. None means the snapshot needs the LLM.
+        """
+        if kind == "project":
+            answer = self._rules_fast_path_project(data)
+        else:
+            answer = self._rules_fast_path_task(data)
+        if answer is None:
+            answer = self._classifier_answer(kind, data)
+        return answer
+
+    def _rules_fast_path_project(self, project_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Rule-based answer when every task shares one status (or there are none).
+        Only mixed distributions need the LLM's judgement.
+        """
+        if not settings.LLM_RULES_FAST_PATH:
+            return None
+
+        statuses = {task.get('status', 'to_do') for task in project_data.get('tasks', [])}
+        if len(statuses) > 1:
+            return None
+
+        result = self._fallback_status_calculation_project(project_data)
+        return self._mark_rules_result(result)
+
+    def _rules_fast_path_task(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Rule-based answer when every subtask shares one status (or there are none)"""
+        if not settings.LLM_RULES_FAST_PATH:
+            return None
+
+        statuses = {subtask.get('status', 'to_do') for subtask in task_data.get('subtasks', [])}
+        if len(statuses) > 1:
+            return None
+
+        result = self._fallback_status_calculation(task_data)
+        return self._mark_rules_result(result)
+
+    def _classifier_answer(self, kind: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Answer of the distilled status classifier when it is confident enough,
+        None sends the call on to the LLM.
+        """
+        if not settings.LLM_CLASSIFIER_ENABLED:
+            return None
+
+        prediction = status_classifier.predict(kind, snapshot_counts(kind, data))
+        if prediction is None:
+            return None
+        if prediction["confidence"] < settings.LLM_CLASSIFIER_MIN_CONFIDENCE:
+            llm_metrics.increment("classifier_deferred", kind)
+            return None
+        llm_metrics.increment("classifier_answers", kind)
+        return prediction
+
+    def _mark_rules_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        # a uniform distribution has exactly one sensible answer
+        result["confidence"] = 1.0
+        result["fallback"] = False
+        result["source"] = "rules"
+        return result
+
+    async def _post_chat(
+            self,
+            system_prompt: str,
+            prompt: str,
+            operation: str,
+            model: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Send one chat completion once admission control grants a slot.
+        Raises AdmissionRejected (429/503) when the call is shed.
+        """
+        async with admission.slot():
+            return await self._dispatch_chat(system_prompt, prompt, operation, model)
+
+    async def _dispatch_chat(
+            self,
+            system_prompt: str,
+            prompt: str,
+            operation: str,
+            model: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Send one chat completion to the least busy healthy backend.
+
+        Raises OllamaUnavailableError without touching the network while every
+        backend is ejected. When hedging is on and the call runs past the
+        recent latency percentile, a copy goes to a second backend and the
+        first answer wins. Returns the response body and the call's telemetry.
+        """
+        backend = self.backends.acquire()
+        if backend is None:
+            raise OllamaUnavailableError("Every Ollama backend is unavailable")
+
+        # streamed internally so reading can stop at the end of the JSON answer
+        payload = self._chat_payload(system_prompt, prompt, operation, model, stream=self.early_stop)
+        delay = self.backends.hedge_delay(operation)
+        if delay is None:
+            return await self._send(backend, payload, operation)
+
+        first = asyncio.create_task(self._send(backend, payload, operation))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                second_backend = self.backends.acquire(exclude=backend)
+                if second_backend is not None:
+                    llm_metrics.increment("hedged_requests", operation)
+                    pending.add(asyncio.create_task(self._send(second_backend, payload, operation)))
+
+            error: Optional[BaseException] = None
+            while done or pending:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            raise error
+        finally:
+            # the slower copy is cancelled, closing its connection stops the generation
+            for task in pending:
+                task.cancel()
+
+    async def _send(
+            self,
+            backend: OllamaBackend,
+            payload: Dict[str, Any],
+            operation: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        One request to one backend. Timeouts, connection errors and 5xx
+        answers count towards ejecting it.
+        """
+        started = time.perf_counter()
+        marks: Dict[str, float] = {}
+        backend.start()
+        try:
+            if payload["stream"]:
+                response_data = await self._read_until_complete(backend, payload, operation, marks)
+                response = None
+            else:
+                client = self._get_client()
+                response = await client.post(
+                    backend.url,
+                    json=payload,
+                    timeout=self.timeout,
+                    extensions={"trace": self._trace(marks)}
+                )
+        except httpx.HTTPError as e:
+            backend.breaker.record_failure(type(e).__name__)
+            raise
+        except BaseException:
+            backend.breaker.release_probe()
+            raise
+        finally:
+            backend.finish()
+
+        if response is None:
+            backend.breaker.record_success()
+        else:
+            if response.status_code >= 500:
+                backend.breaker.record_failure(f"HTTP {response.status_code}")
+            else:
+                backend.breaker.record_success()
+
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"Ollama api error :{response.text}"
+                )
+            response_data = response.json()
+        telemetry = self._telemetry(started, marks, response_data, backend)
+        self._record_telemetry(operation, telemetry)
+        self.backends.record_latency(operation, telemetry["wall_ms"])
+        return response_data, telemetry
+
+    async def _read_until_complete(
+            self,
+            backend: OllamaBackend,
+            payload: Dict[str, Any],
+            operation: str,
+            marks: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """
+        Stream the completion and stop reading once the first JSON object is
+        complete. Leaving the stream closes the connection, which makes Ollama
+        stop generating the trailing commentary we would throw away.
+        Returns a body shaped like the non-streamed response.
+        """
+        parts: List[str] = []
+        stats: Dict[str, Any] = {}
+        async with self._get_client().stream(
+            "POST",
+            backend.url,
+            json=payload,
+            timeout=self.timeout,
+            extensions={"trace": self._trace(marks)}
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                detail = f"Ollama api error :{body[:200]!r}"
+                if response.status_code >= 500:
+                    raise httpx.HTTPStatusError(detail, request=response.request, response=response)
+                raise HTTPException(status_code=response.status_code, detail=detail)
+
+            async for piece in self._stream_pieces(response, operation, marks, stats):
+                parts.append(piece)
+
+        return self._streamed_body(payload["model"], parts, stats)
+
+    @property
+    def early_stop(self) -> bool:
+        # also with the schema constraint: the grammar still lets the model pad
+        # the closed object with whitespace up to the token cap
+        return settings.LLM_EARLY_STOP
+
+    async def _stream_pieces(
+            self,
+            response: httpx.Response,
+            operation: str,
+            marks: Dict[str, float],
+            stats: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """
+        Generated text of a streamed response, piece by piece. Token counts
+        and durations of the final chunk are copied into `stats`.
+
+        With early stop on, reading ends after the first complete JSON
+        object: the final stats chunk is awaited for at most
+        LLM_EARLY_STOP_STATS_GRACE_MS, and any further text closes the
+        stream at once so Ollama stops generating it.
+        """
+        scanner = JsonObjectScanner() if self.early_stop else None
+        lines = response.aiter_lines()
+        deadline: Optional[float] = None
+        stopped = False
+        while True:
+            try:
+                if deadline is None:
+                    line = await anext(lines)
+                else:
+                    line = await asyncio.wait_for(anext(lines), timeout=max(0.0, deadline - time.perf_counter()))
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                stopped = True
+                break
+
+            try:
+                chunk = self._parse_stream_line(line)
+            except ValueError as e:
+                raise httpx.DecodingError(f"Bad stream chunk: {e}", request=response.request)
+            if chunk is None:
+                continue
+            stats.update(self._chunk_stats(chunk))
+            piece = self._chunk_content(chunk)
+            if piece is None:
+                continue
+            if deadline is not None:
+                # trailing commentary after the answer
+                stopped = True
+                break
+
+            marks.setdefault("first_token", time.perf_counter())
+            yield piece
+            if scanner is not None and scanner.feed(piece) is not None:
+                deadline = time.perf_counter() + settings.LLM_EARLY_STOP_STATS_GRACE_MS / 1000
+
+        if stopped:
+            llm_metrics.increment("early_stops", operation)
+
+    def _streamed_body(self, model: str, parts: List[str], stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Body shaped like the non-streamed response, with the final chunk's stats"""
+        content = "".join(parts)
+        # every streamed chunk carries one generated token, the count stands in
+        # when the stream was closed before the final chunk
+        if self.native_api:
+            return {
+                "model": model,
+                "message": {"role": "assistant", "content": content},
+                "eval_count": len(parts),
+                **stats
+            }
+        return {
+            "model": model,
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": stats.get("usage") or {"completion_tokens": len(parts)}
+        }
+
+    def _trace(self, marks: Dict[str, float]):
+        """httpx trace hook noting when the request went out and the headers came back"""
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name.endswith(".send_request_headers.started"):
+                marks.setdefault("request_sent", time.perf_counter())
+            elif event_name.endswith(".receive_response_headers.complete"):
+                marks.setdefault("headers_received", time.perf_counter())
+        return trace
+
+    def _telemetry(
+            self,
+            started: float,
+            marks: Dict[str, float],
+            response_data: Dict[str, Any],
+            backend: OllamaBackend
+    ) -> Dict[str, Any]:
+        """
+        Timings of one call. connection_wait_ms is pool wait plus connect,
+        everything before the request bytes went out.
+        """
+        def since_start(mark: str) -> Optional[float]:
+            return round((marks[mark] - started) * 1000, 1) if mark in marks else None
+
+        telemetry: Dict[str, Any] = {
+            "model": response_data.get("model") or self.model,
+            "backend": backend.url,
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+            "connection_wait_ms": since_start("request_sent"),
+            "time_to_headers_ms": since_start("headers_received"),
+            "time_to_first_token_ms": since_start("first_token")
+        }
+
+        usage = response_data.get("usage") or {}
+        telemetry["prompt_tokens"] = response_data.get("prompt_eval_count", usage.get("prompt_tokens"))
+        telemetry["completion_tokens"] = response_data.get("eval_count", usage.get("completion_tokens"))
+
+        # native durations are nanoseconds
+        for field, name in (
+            ("load_duration", "load_ms"),
+            ("prompt_eval_duration", "prompt_eval_ms"),
+            ("eval_duration", "eval_ms"),
+            ("total_duration", "total_ms")
+        ):
+            value = response_data.get(field)
+            telemetry[name] = round(value / 1e6, 1) if value is not None else None
+
+        if telemetry["total_ms"] is not None:
+            # time Ollama held the request before loading/prefill/decode, i.e. its queue
+            telemetry["server_queue_ms"] = round(max(0.0, telemetry["total_ms"] - sum(
+                telemetry[name] or 0.0 for name in ("load_ms", "prompt_eval_ms", "eval_ms")
+            )), 1)
+
+        if telemetry["eval_ms"] and telemetry["completion_tokens"]:
+            telemetry["decode_tokens_per_second"] = round(
+                telemetry["completion_tokens"] / (telemetry["eval_ms"] / 1000), 1
+            )
+        return telemetry
+
+    def _record_telemetry(self, operation: str, telemetry: Dict[str, Any]) -> None:
+        for name in (
+            "wall_ms",
+            "connection_wait_ms",
+            "server_queue_ms",
+            "time_to_first_token_ms",
+            "load_ms",
+            "prompt_eval_ms",
+            "eval_ms",
+            "prompt_tokens",
+            "completion_tokens"
+        ):
+            value = telemetry.get(name)
+            if value is not None:
+                llm_metrics.observe(f"llm_{name}", operation, value)
+
+    def _chat_payload(
+            self,
+            system_prompt: str,
+            prompt: str,
+            operation: str,
+            model: str,
+            stream: bool = False
+    ) -> Dict[str, Any]:
+        model_router.record(operation, model)
+        payload = {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "stream": stream
+        }
+        if settings.OLLAMA_KEEP_ALIVE:
+            # how long Ollama keeps the model loaded after this request
+            payload["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
+        # the answer is a small JSON object, never let a runaway generation go on
+        max_tokens = {
+            "project": settings.LLM_MAX_TOKENS_PROJECT,
+            "project_chunk": settings.LLM_MAX_TOKENS_PROJECT_CHUNK,
+            "task": settings.LLM_MAX_TOKENS_TASK
+        }[operation]
+        if self.native_api:
+            payload["options"] = {
+                "temperature": payload.pop("temperature"),
+                "num_predict": max_tokens
+            }
+            if settings.LLM_STRUCTURED_OUTPUT:
+                payload["format"] = RESPONSE_SCHEMAS[operation]
+        else:
+            payload["max_tokens"] = max_tokens
+            if stream:
+                # the token counts come as a last chunk only when asked for
+                payload["stream_options"] = {"include_usage": True}
+            if settings.LLM_STRUCTURED_OUTPUT:
+                # Ollama's OpenAI endpoint turns this into its grammar-constrained `format`
+                payload["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": f"{operation}_analysis",
+                        "schema": RESPONSE_SCHEMAS[operation],
+                        "strict": True
+                    }
+                }
+        return payload
+
+    def _build_task_prompt(self, task_data: Dict[str, Any]) -> str:
+        """Build the prompt for Qwen to derive a task status from its subtasks"""
+        subtasks = task_data.get('subtasks', [])
+        fields = {
+            "title": task_data.get('title'),
+            "status": task_data.get('status'),
+            "total": len(subtasks)
+        }
+        # whatever the fixed part of the prompt does not use goes to subtask lines
+        skeleton = TASK_PROMPT_TEMPLATE.format(subtasks="", **fields)
+        budget = settings.LLM_PROMPT_TOKEN_BUDGET - estimate_tokens(skeleton)
+
+        return TASK_PROMPT_TEMPLATE.format(
+            subtasks=self._format_subtasks(subtasks, budget),
+            **fields
+        )
         
     def _build_status_prompt(self, project_data: Dict[str,Any])->str:
         """Build a detailed prompt for Qwen to analyze project status"""
 
         tasks = project_data.get("tasks",[])
-        task_summary = self._summarize_tasks(tasks)
-        
-        prompt = f"""
-        Analyze this project and recommend an overall status.
-
-        Project: {project_data.get('name')}
-        Current Status: {project_data.get('status')}
-        Deadline: {project_data.get('deadline')}
-        Total Tasks: {len(tasks)}
-
-        Task Status Summary:
-        {task_summary}
-
-        Detailed Task Information:
-        {self._format_tasks_detail(tasks)}
-
-        Please analyze and respond with JSON only (no markdown, no code blocks):
-        {{
-            "recommended_status": "to_do|in_progress|review|done",
-            "confidence": 0.0-1.0,
-            "reasoning": "detailed explanation",
-            "risk_level": "low|medium|high",
-            "completion_percentage": 0-100,
-            "recommendations": ["action item 1", "action item 2"]
-        }}
+        fields = {
+            "name": project_data.get('name'),
+            "status": project_data.get('status'),
+            "deadline": project_data.get('deadline'),
+            "total": len(tasks),
+            "summary": self._summarize_tasks(tasks)
+        }
+        skeleton = PROJECT_PROMPT_TEMPLATE.format(details="", **fields)
+        budget = settings.LLM_PROMPT_TOKEN_BUDGET - estimate_tokens(skeleton)
+
+        return PROJECT_PROMPT_TEMPLATE.format(
+            details=self._format_tasks_detail(tasks, budget),
+            **fields
+        )
+    
+    def _build_delta_prompt(self, project_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Prompt with the previous analysis and only the tasks changed since,
+        None when a full prompt is needed: no baseline, too many deltas in a
+        row, or too much changed for the delta to be the smaller prompt.
         """
+        if not settings.LLM_DELTA_PROMPTS:
+            return None
+        baseline = project_baselines.get(project_data["id"])
+        if baseline is None or baseline["chain"] >= settings.LLM_DELTA_MAX_CHAIN:
+            return None
+
+        tasks = project_data.get("tasks", [])
+        changes = project_baselines.changes(baseline, project_data)
+        if len(changes) > settings.LLM_DELTA_MAX_CHANGED_TASKS:
+            return None
+        if tasks and len(changes) / len(tasks) > settings.LLM_DELTA_MAX_CHANGE_RATIO:
+            return None
+
+        previous = baseline["analysis"]
+        prompt = DELTA_PROMPT_TEMPLATE.format(
+            name=project_data.get('name'),
+            status=project_data.get('status'),
+            deadline=project_data.get('deadline'),
+            total=len(tasks),
+            summary=self._summarize_tasks(tasks),
+            previous_status=previous.get("recommended_status"),
+            previous_confidence=previous.get("confidence"),
+            previous_completion=previous.get("completion_percentage"),
+            previous_risk=previous.get("risk_level"),
+            previous_reasoning=str(previous.get("reasoning") or "")[:600],
+            count=len(changes),
+            changes="\n".join(changes) or "No task changed, only project details may differ"
+        )
+        if estimate_tokens(prompt) > settings.LLM_PROMPT_TOKEN_BUDGET:
+            return None
+        llm_metrics.increment("delta_prompts", "project")
         return prompt
-    
+
+    def _remember_analysis(self, project_data: Dict[str, Any], analysis: Dict[str, Any], delta: bool) -> None:
+        """Keep an LLM answer as the baseline of the next delta prompt"""
+        if settings.LLM_DELTA_PROMPTS and analysis.get("source") == "llm" and "error" not in analysis:
+            project_baselines.remember(project_data, analysis, delta)
+
     def _summarize_tasks(self,tasks: List[Dict])-> str:
         "Create a summary of task statuses"
         status_counts = {
@@ -192,64 +1157,88 @@ class QwenService:
         return "\n".join(summary)
 
     
-    def _format_tasks_detail(self,tasks:List[Dict])->str:
-        """Format tasks for prompt"""
-        details=[]
-        for i,task in enumerate(tasks[:15],1):
-            subtasks=task.get('subtasks',[])
-            details.append(
-                f"{i}.{task.get('title')} -Status: {task.get('status')}"
-                f"(Subtasks:{len(subtasks)})"
-            )
-        if len(subtasks)>15:
-            details.append(f".. and {len(tasks)-15} more tasks ")
-
-        return "\n".join(details)
+    def _format_tasks_detail(self,tasks:List[Dict],token_budget:int)->str:
+        """Format the highest-signal tasks for the prompt, the rest as aggregates"""
+        return compact_tasks(tasks, token_budget)
             
-    def _format_subtasks(self,subtasks:List[Dict])->str:
-        """Format subtaks for the prompt"""
-        if not subtasks:
-            return "no subtasks"
-
-        formatted=[]
-        for i,subtask in enumerate(subtasks,1):
-            formatted.append(
-                f"{i}. {subtask.get('title')}-{subtask.get('status')}"
-            )
-        return "\n".join(formatted)
+    def _format_subtasks(self,subtasks:List[Dict],token_budget:int)->str:
+        """Format subtaks for the prompt within the token budget"""
+        return compact_subtasks(subtasks, token_budget)
     
 
-    def _parse_ollama_response(self, response_data: Dict) -> Dict[str, Any]:
+    def _parse_stream_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """One chunk of a streamed response, None for blank and end-of-stream lines"""
+        line = line.strip()
+        if not line:
+            return None
+        # OpenAI-compatible streams are SSE: "data: {...}" ... "data: [DONE]"
+        if line.startswith("data:"):
+            line = line[5:].strip()
+        if line == "[DONE]":
+            return None
+
+        chunk = json.loads(line)
+        if not isinstance(chunk, dict):
+            raise ValueError("Stream chunk is not an object")
+        return chunk
+
+    def _chunk_stats(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """Token counts and durations, sent on the final chunk only"""
+        if chunk.get('usage'):
+            return {"usage": chunk['usage']}
+        return {field: chunk[field] for field in STREAM_STATS_FIELDS if field in chunk}
+
+    def _chunk_content(self, chunk: Dict[str, Any]) -> Optional[str]:
+        """Generated text of one stream chunk"""
+        choices = chunk.get('choices')
+        if choices:
+            return choices[0].get('delta', {}).get('content') or None
+        # native /api/chat streams one JSON object per line
+        return chunk.get('message', {}).get('content') or None
+
+    def _parse_ollama_response(self, response_data: Dict, operation: str) -> Dict[str, Any]:
         """Parse Ollama API response and extract JSON"""
+        if not self.native_api and not response_data.get('choices'):
+            return self._parse_content("", operation, error="No choices in response")
+        return self._parse_content(self._response_content(response_data), operation)
+
+    def _response_content(self, response_data: Dict) -> str:
+        """Generated text of a non-streamed response"""
+        # native /api/chat answers with a single message
+        if self.native_api:
+            message = response_data.get('message') or {}
+            return message.get('content') or ""
+
+        # Ollama uses OpenAI-compatible format
+        choices = response_data.get('choices') or []
+        if not choices:
+            return ""
+        return choices[0].get('message', {}).get('content') or ""
+
+    def _parse_content(
+            self,
+            content: str,
+            operation: str,
+            error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Parse the generated text, full or accumulated from a stream, into the analysis dict"""
+        llm_metrics.increment("parse_total", operation)
         try:
-            # Ollama uses OpenAI-compatible format
-            choices = response_data.get('choices', [])
-            
-            if not choices:
-                raise ValueError("No choices in response")
-            
-            message = choices[0].get('message', {})
-            content = message.get('content', '')
-            
-            content = content.strip()
-            
-            # when you tell llm to give response in json format it gives response like: ```json
-            # to remove that markdowns
-            if content.startswith('```json'):
-                content = content[7:]
-            elif content.startswith('```'):
-                content = content[3:]
-            
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            content = content.strip()
+            if error:
+                raise ValueError(error)
+
+            # first balanced object, whatever fences or chatter surround it
+            raw = extract_json_object(content)
+            if raw is None:
+                raise ValueError("No JSON object in response")
             
             # Parse JSON
-            result = json.loads(content)
+            result = json.loads(raw)
             
             if 'recommended_status' not in result:
                 raise ValueError("Missing recommended_status in response")
+            if result['recommended_status'] not in STATUSES:
+                raise ValueError(f"Unknown recommended_status {result['recommended_status']!r}")
             
             # confidence has to be between 0 and 1 to make it consistent
             if 'confidence' in result:
@@ -258,9 +1247,11 @@ class QwenService:
             else:
                 result['confidence'] = 0.7  # Default confidence
             
+            result['source'] = 'llm'
             return result
             
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+        except (json.JSONDecodeError, KeyError, ValueError, TypeError) as e:
+            llm_metrics.increment("parse_failures", operation)
             print(f"Failed to parse Ollama response: {e}")
             print(f"Raw content: {content[:200] if 'content' in locals() else 'N/A'}")
             
@@ -268,9 +1259,18 @@ class QwenService:
                 "recommended_status": "in_progress",
                 "confidence": 0.5,
                 "reasoning": f"Unable to parse LLM response: {str(e)[:100]}",
-                "error": str(e)
+                "error": str(e),
+                "source": "llm"
             }
 
+    def fallback_task_status(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Rule-based task answer without calling Ollama"""
+        return self._fallback_status_calculation(task_data)
+
+    def fallback_project_status(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Rule-based project answer without calling Ollama"""
+        return self._fallback_status_calculation_project(project_data)
+
     def _fallback_status_calculation(self, task_data: Dict) -> Dict[str, Any]:
         """Rule-based fallback if Ollama is unavailable"""
         subtasks = task_data.get('subtasks', [])
@@ -281,7 +1281,8 @@ class QwenService:
                 "confidence": 1.0,
                 "reasoning": "No subtasks, keeping current status",
                 "completion_percentage": 0,
-                "fallback": True
+                "fallback": True,
+                "source": "fallback"
             }
         
         status_counts = {}
@@ -314,7 +1315,8 @@ class QwenService:
             "confidence": 0.9,
             "reasoning": reasoning,
             "completion_percentage": int(completion_pct),
-            "fallback": True
+            "fallback": True,
+            "source": "fallback"
         }
     
     def _fallback_status_calculation_project(self, project_data: Dict) -> Dict[str, Any]:
@@ -327,7 +1329,8 @@ class QwenService:
                 "confidence": 1.0,
                 "reasoning": "No tasks in project",
                 "completion_percentage": 0,
-                "fallback": True
+                "fallback": True,
+                "source": "fallback"
             }
         
         status_counts = {
@@ -368,7 +1371,8 @@ class QwenService:
             "completion_percentage": int(completion_pct),
             "risk_level": "low" if completion_pct > 50 else "medium",
             "recommendations": [],
-            "fallback": True
+            "fallback": True,
+            "source": "fallback"
         }
 
 
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from typing import Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import select
+
+from core.config import settings
+from core.database_async import AsyncSessionLocal
+from projects.models.models_v1 import Project
+from llm.models.models_v1 import LLMJob
+from llm.utils.enum import JobKind, JobStatus
+from llm.services.job_queue import enqueue_job
+
+
+class DirtyProjectSet:
+    """Projects whose tasks or subtasks changed since they were last re-analyzed"""
+
+    def __init__(self):
+        self._projects: Set[UUID] = set()
+        # TaskRepository writes come from threadpool workers
+        self._lock = threading.Lock()
+
+    def mark(self, project_id: UUID) -> None:
+        with self._lock:
+            self._projects.add(project_id)
+
+    def drain(self, limit: int) -> List[UUID]:
+        with self._lock:
+            batch = list(self._projects)[:limit]
+            self._projects.difference_update(batch)
+        return batch
+
+    def restore(self, project_ids: Iterable[UUID]) -> None:
+        """Put drained projects back, e.g. when queuing their update failed"""
+        with self._lock:
+            self._projects.update(project_ids)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._projects)
+
+
+dirty_projects = DirtyProjectSet()
+
+
+class ReanalysisScheduler:
+    """
+    Periodically queues an intelligent status update for dirty projects only.
+
+    Every interval at most `max_per_tick` projects are taken from the dirty
+    set, the rest wait for the next tick, so LLM load follows the rate of
+    change instead of portfolio size. Projects that already have an update
+    job queued or running are skipped.
+    """
+
+    def __init__(self, interval: float, max_per_tick: int):
+        self.interval = interval
+        self.max_per_tick = max_per_tick
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Re-analysis tick failed: {e}")
+
+    async def tick(self) -> int:
+        batch = dirty_projects.drain(self.max_per_tick)
+        if not batch:
+            return 0
+
+        queued = 0
+        # each enqueue commits on its own, so only what is left here is lost on an error
+        remaining = list(batch)
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(LLMJob.project_id).where(
+                        LLMJob.kind == JobKind.update_project_status,
+                        LLMJob.status.in_([JobStatus.queued, JobStatus.running]),
+                        LLMJob.project_id.in_(batch)
+                    )
+                )
+                pending = set(result.scalars())
+
+                result = await session.execute(
+                    select(Project.id).where(
+                        Project.id.in_(batch),
+                        Project.is_active.is_(True)
+                    )
+                )
+                active = set(result.scalars())
+
+                while remaining:
+                    project_id = remaining[0]
+                    if project_id not in pending and project_id in active:
+                        await enqueue_job(session, JobKind.update_project_status, project_id=project_id)
+                        queued += 1
+                    remaining.pop(0)
+        except Exception:
+            # a database blip must not drop changes, retry them on the next tick
+            dirty_projects.restore(remaining)
+            raise
+
+        return queued
+
+
+reanalysis_scheduler = ReanalysisScheduler(
+    interval=settings.LLM_REANALYZE_INTERVAL_SECONDS,
+    max_per_tick=settings.LLM_REANALYZE_MAX_PER_TICK
+)
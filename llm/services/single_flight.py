@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        # a waiter gave up on a budget, the late answer is still wanted for the cache
+        self.keep = False
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key onto one in-flight task.
+
+    The first caller for a key starts the work, later callers await the same
+    task until it finishes. The task is shielded so one caller going away
+    does not cancel the work the others are waiting on; only when the last
+    waiter is cancelled (its client disconnected) is the work cancelled too.
+    A waiter that runs out of `timeout` leaves the work running so its
+    result still lands in the cache.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.abandoned = 0
+
+    async def do(
+            self,
+            key: str,
+            fn: Callable[[], Awaitable[Any]],
+            timeout: Optional[float] = None
+    ) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda t, key=key: self._forget(key, t))
+
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout=timeout)
+        except asyncio.TimeoutError:
+            call.keep = True
+            raise
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.keep and not call.task.done():
+                # nobody is left to read the answer, stop the generation
+                call.task.cancel()
+                self.abandoned += 1
+                # a caller arriving while it unwinds starts fresh work
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            raise
+        finally:
+            call.waiters -= 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "waiters": sum(call.waiters for call in self._calls.values()),
+            "abandoned": self.abandoned
+        }
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is not None and call.task is task:
+            del self._calls[key]
+        # mark the exception retrieved even if every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,184 @@
+import json
+import math
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from llm.services.prompt_compaction import STATUSES, status_counts
+
+FEATURE_COUNT = len(STATUSES) + 2
+
+
+def snapshot_counts(kind: str, data: Dict[str, Any]) -> Dict[str, int]:
+    """Status counts the classifier sees: tasks of a project, subtasks of a task"""
+    items = data.get("tasks", []) if kind == "project" else data.get("subtasks", [])
+    return status_counts(items)
+
+
+def features(counts: Dict[str, int]) -> List[float]:
+    """Bias, the share of each status and the (log) size of the distribution"""
+    total = sum(counts.get(status, 0) for status in STATUSES)
+    shares = [counts.get(status, 0) / total if total else 0.0 for status in STATUSES]
+    return [1.0, *shares, math.log1p(total) / 5]
+
+
+def _softmax(logits: List[float]) -> List[float]:
+    top = max(logits)
+    exps = [math.exp(logit - top) for logit in logits]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+
+def _dot(weights: List[float], x: List[float]) -> float:
+    return sum(w * v for w, v in zip(weights, x))
+
+
+def train(
+        samples: List[Tuple[Dict[str, int], str, float]],
+        epochs: int = 300,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4
+) -> Dict[str, Any]:
+    """
+    Fit a softmax regression for the status and a linear regression for the
+    completion share on (status counts, recommended_status, completion %)
+    samples. Identical distributions are merged first, so an epoch costs one
+    pass over the distinct distributions rather than over every sample.
+    """
+    grouped: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+    for counts, label, completion in samples:
+        key = tuple(counts.get(status, 0) for status in STATUSES)
+        group = grouped.setdefault(key, {"labels": [0.0] * len(STATUSES), "completion": 0.0, "n": 0})
+        group["labels"][STATUSES.index(label)] += 1
+        group["completion"] += completion / 100
+        group["n"] += 1
+
+    rows = [
+        (
+            features(dict(zip(STATUSES, key))),
+            [count / group["n"] for count in group["labels"]],
+            group["completion"] / group["n"],
+            group["n"] / len(samples)
+        )
+        for key, group in grouped.items()
+    ]
+
+    weights = [[0.0] * FEATURE_COUNT for _ in STATUSES]
+    completion = [0.0] * FEATURE_COUNT
+    for _ in range(epochs):
+        gradients = [[l2 * w for w in row] for row in weights]
+        completion_gradient = [l2 * w for w in completion]
+        for x, target, share, weight in rows:
+            probabilities = _softmax([_dot(row, x) for row in weights])
+            for k in range(len(STATUSES)):
+                error = (probabilities[k] - target[k]) * weight
+                for j, value in enumerate(x):
+                    gradients[k][j] += error * value
+            error = (_dot(completion, x) - share) * weight
+            for j, value in enumerate(x):
+                completion_gradient[j] += error * value
+        for k in range(len(STATUSES)):
+            for j in range(FEATURE_COUNT):
+                weights[k][j] -= learning_rate * gradients[k][j]
+        for j in range(FEATURE_COUNT):
+            completion[j] -= learning_rate * completion_gradient[j]
+
+    return {
+        "labels": list(STATUSES),
+        "weights": weights,
+        "completion": completion,
+        "samples": len(samples)
+    }
+
+
+def predict(model: Dict[str, Any], kind: str, counts: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """Answer of one trained model for a distribution, None when there is nothing to classify"""
+    if not sum(counts.get(status, 0) for status in STATUSES):
+        return None
+
+    x = features(counts)
+    probabilities = _softmax([_dot(row, x) for row in model["weights"]])
+    best = max(range(len(probabilities)), key=probabilities.__getitem__)
+    completion_pct = max(0.0, min(1.0, _dot(model["completion"], x))) * 100
+    result = {
+        "recommended_status": model["labels"][best],
+        "confidence": round(probabilities[best], 4),
+        "reasoning": (
+            f"Predicted from the status distribution by a classifier trained on "
+            f"{model['samples']} past LLM analyses"
+        ),
+        "completion_percentage": int(completion_pct),
+        "source": "classifier"
+    }
+    if kind == "project":
+        result["risk_level"] = "low" if completion_pct > 50 else "medium"
+        result["recommendations"] = []
+    return result
+
+
+class StatusClassifier:
+    """
+    Status model distilled from stored LLM analyses, answering from the
+    status distribution alone in microseconds.
+
+    The model file is written offline by train_status_classifier and
+    reloaded when it changes on disk. Without a file every prediction is
+    None and calls go to the LLM as before.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.trained_at: Optional[str] = None
+        self._mtime: Optional[float] = None
+
+    def predict(self, kind: str, counts: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        self._reload_if_changed()
+        model = self.models.get(kind)
+        return predict(model, kind, counts) if model is not None else None
+
+    def save(self, models: Dict[str, Dict[str, Any]]) -> None:
+        document = {
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "features": ["bias", *STATUSES, "log_total"],
+            "models": models
+        }
+        # write then rename so a running app never reads half a file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(document, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._reload_if_changed()
+        return {
+            "path": self.path,
+            "trained_at": self.trained_at,
+            "kinds": {
+                kind: {key: model.get(key) for key in ("samples", "holdout_accuracy")}
+                for kind, model in self.models.items()
+            }
+        }
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.models = {}
+            self._mtime = None
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            with open(self.path) as f:
+                document = json.load(f)
+            self.models = document.get("models", {})
+            self.trained_at = document.get("trained_at")
+        except (OSError, ValueError) as e:
+            print(f"Could not load status classifier from {self.path}: {e}")
+            self.models = {}
+
+
+status_classifier = StatusClassifier(settings.LLM_CLASSIFIER_PATH)
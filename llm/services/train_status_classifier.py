@@ -0,0 +1,107 @@
+"""
+Train the status classifier from analyses stored in llm_reports.
+
+Only LLM answers stored together with the status counts they were made from
+are used. The newest share of samples is held out to report accuracy and
+how many calls the classifier would have answered at the serving threshold.
+
+    python -m llm.services.train_status_classifier --model qwen2.5:7b
+"""
+import argparse
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from core.config import settings
+from core.database_async import AsyncSessionLocal
+from reports.models.models_v1 import LLMReport
+from llm.services.prompt_compaction import STATUSES
+from llm.services.status_classifier import predict, status_classifier, train
+
+Sample = Tuple[Dict[str, int], str, float]
+
+
+async def load_samples(kind: str, model: Optional[str]) -> List[Sample]:
+    query = (
+        select(LLMReport.result)
+        .where(LLMReport.kind == kind, LLMReport.result.is_not(None))
+        .order_by(LLMReport.created_at)
+    )
+    if model:
+        query = query.where(LLMReport.model == model)
+
+    async with AsyncSessionLocal() as session:
+        results = (await session.execute(query)).scalars().all()
+
+    samples = []
+    for result in results:
+        counts = result.get("status_counts")
+        label = result.get("recommended_status")
+        if result.get("source") != "llm" or "error" in result or not counts or label not in STATUSES:
+            continue
+        try:
+            completion = float(result.get("completion_percentage") or 0)
+        except (TypeError, ValueError):
+            continue
+        samples.append((counts, label, completion))
+    return samples
+
+
+def evaluate(model: Dict[str, Any], kind: str, samples: List[Sample], threshold: float) -> Dict[str, Any]:
+    predictions = [(predict(model, kind, counts), label) for counts, label, _ in samples]
+    predictions = [(prediction, label) for prediction, label in predictions if prediction is not None]
+    confident = [(prediction, label) for prediction, label in predictions if prediction["confidence"] >= threshold]
+    return {
+        "holdout_samples": len(samples),
+        "holdout_accuracy": _accuracy(predictions),
+        "coverage_at_threshold": round(len(confident) / len(predictions), 4) if predictions else 0.0,
+        "accuracy_at_threshold": _accuracy(confident)
+    }
+
+
+def _accuracy(pairs: List[Tuple[Dict[str, Any], str]]) -> Optional[float]:
+    if not pairs:
+        return None
+    return round(sum(1 for prediction, label in pairs if prediction["recommended_status"] == label) / len(pairs), 4)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.OLLAMA_MODEL, help="only distill answers of this model ('' for all)")
+    parser.add_argument("--kinds", default="project,task")
+    parser.add_argument("--holdout", type=float, default=0.2, help="newest share of samples kept for evaluation")
+    parser.add_argument("--min-samples", type=int, default=200)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--output", default=settings.LLM_CLASSIFIER_PATH)
+    args = parser.parse_args()
+
+    models = {}
+    for kind in [kind.strip() for kind in args.kinds.split(",") if kind.strip()]:
+        samples = await load_samples(kind, args.model or None)
+        if len(samples) < args.min_samples:
+            print(f"{kind}: {len(samples)} samples, need {args.min_samples}, skipped")
+            continue
+
+        split = int(len(samples) * (1 - args.holdout))
+        model = train(samples[:split], epochs=args.epochs, learning_rate=args.learning_rate)
+        metrics = evaluate(model, kind, samples[split:], settings.LLM_CLASSIFIER_MIN_CONFIDENCE)
+        print(f"{kind}: {len(samples)} samples, {metrics}")
+
+        # the served model learns from every sample
+        model = train(samples, epochs=args.epochs, learning_rate=args.learning_rate)
+        model.update(metrics)
+        models[kind] = model
+
+    if not models:
+        print("Nothing trained, model file left as it is")
+        return
+
+    status_classifier.path = args.output
+    status_classifier.save(models)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,21 @@
+from enum import Enum
+
+
+class JobKind(str, Enum):
+    analyze_project = "analyze_project"
+    analyze_task = "analyze_task"
+    update_project_status = "update_project_status"
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class Priority(str, Enum):
+    """LLM admission classes, in the order they are served"""
+    interactive = "interactive"
+    mcp = "mcp"
+    background = "background"
@@ -1,4 +1,6 @@
+import httpx
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi_mcp import FastApiMCP
 from users.routes.routes_v1 import router as users_router
@@ -14,33 +16,61 @@ from llm.routes.routes_v1 import (
     update_project_status_intelligent,
     router as mcp_http_router 
 )
+from llm.services.qwen_service_ollama import qwen_service
+from llm.services.job_queue import job_worker
+from llm.services.reanalysis_scheduler import reanalysis_scheduler
+from llm.services.model_warmer import model_warmer
+from core.config import settings
 
 from users.models import models_v1
 from projects.models import models_v1
 from reports.models import models_v1
 from teams.models import models_v1
+from llm.models import models_v1
 
 
-app = FastAPI(title="LLM Task Manager")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one pooled Ollama client for the whole process
+    await qwen_service.startup()
+    # loads the model in the background, startup does not wait on Ollama
+    await model_warmer.start()
+    await job_worker.start()
+    await reanalysis_scheduler.start()
+    yield
+    await reanalysis_scheduler.stop()
+    await job_worker.stop()
+    await model_warmer.stop()
+    await qwen_service.shutdown()
+
+
+app = FastAPI(title="LLM Task Manager", lifespan=lifespan)
 
 app.include_router(users_router, prefix="/users")
 app.include_router(projects_router, prefix="/projects")
 app.include_router(tasks_router, prefix="/tasks")
 app.include_router(reports_router, prefix="/reports")
 app.include_router(teams_router, prefix="/teams")
+# before FastApiMCP, which turns the routes registered at construction into tools
+app.include_router(mcp_http_router)
 
 mcp = FastApiMCP(
                 app,
                 name="My MCP",
-                description="Just Checking MCP" 
+                description="Just Checking MCP",
+                # tool calls go through the routes in-process; tag them for LLM admission
+                # and give them more than the default 10s an analysis can take
+                http_client=httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=app),
+                    base_url="http://apiserver",
+                    headers={"X-LLM-Priority": "mcp"},
+                    timeout=settings.OLLAMA_TIMEOUT + settings.LLM_ADMISSION_QUEUE_TIMEOUT_SECONDS
+                )
                 )
 
 #to mount mcp server to fastapi app
 mcp.mount_http()
 
-#for testing
-app.include_router(mcp_http_router)
-
 def main():
     # This runs the server when you type "python main.py"
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
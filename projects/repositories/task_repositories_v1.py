@@ -5,12 +5,22 @@ from uuid import UUID
 
 from projects.models.models_v1 import Task, Project
 from projects.schemas.task_schemas_v1 import TaskCreateSchema, TaskUpdateSchema
+from llm.services.analysis_cache import analysis_cache
+from llm.services.reanalysis_scheduler import dirty_projects
 
 
 class TaskRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _on_task_changed(self, task_id: int, parent_id: int | None, project_id: UUID) -> None:
+        # a task change affects its own analysis, its parent's and the project's
+        analysis_cache.invalidate_task(task_id)
+        if parent_id is not None:
+            analysis_cache.invalidate_task(parent_id)
+        analysis_cache.invalidate_project(project_id)
+        dirty_projects.mark(project_id)
+
     def create_task(self, data: TaskCreateSchema, project_id: UUID) -> Task:
         try:
             task_data = data.dict(exclude_unset=True)
@@ -20,6 +30,7 @@ class TaskRepository:
             self.db.add(new_task)
             self.db.commit()
             self.db.refresh(new_task)
+            self._on_task_changed(new_task.id, new_task.parent_id, new_task.project_id)
             return new_task
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -76,6 +87,7 @@ class TaskRepository:
             
             self.db.commit()
             self.db.refresh(task)
+            self._on_task_changed(task.id, task.parent_id, task.project_id)
             return task
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -101,6 +113,7 @@ class TaskRepository:
             task.status = Status[status]
             self.db.commit()
             self.db.refresh(task)
+            self._on_task_changed(task.id, task.parent_id, task.project_id)
             return task
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -108,12 +121,14 @@ class TaskRepository:
 
     def delete_task(self, task_id: int) -> bool:
         task = self.get_task_by_id(task_id)
+        parent_id, project_id = task.parent_id, task.project_id
         
         try:
             self.db.query(Task).filter(Task.parent_id == task_id).delete()
             
             self.db.delete(task)
             self.db.commit()
+            self._on_task_changed(task_id, parent_id, project_id)
             return True
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -8,10 +8,11 @@ from sqlalchemy import (
     Boolean,
     Float,
     Text,
+    String,
     Integer,
     ForeignKey,
 )
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -40,6 +41,14 @@ class LLMReport(Base):
     id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
     text = Column(Text, nullable=False)
     percentage = Column(Float, nullable=False)
+    # what was analyzed and how, so a restart can serve matching snapshots from here
+    kind = Column(String(50), nullable=True)
+    project_id = Column(PGUUID(as_uuid=True), ForeignKey("projects.id"), nullable=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True)
+    snapshot_hash = Column(String(64), nullable=True, index=True)
+    model = Column(String(255), nullable=True)
+    latency_ms = Column(Float, nullable=True)
+    result = Column(JSONB, nullable=True)
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -0,0 +1,34 @@
+import time
+
+from llm.services.analysis_cache import AnalysisCache
+
+
+def test_evicted_keys_leave_the_index():
+    cache = AnalysisCache(maxsize=2, ttl=60)
+    for i in range(5):
+        cache.set(f"key-{i}", {"i": i}, project_id=f"p{i}", task_id=i)
+
+    assert cache.get("key-0") is None
+    assert set(cache._index) == {"project:p3", "task:3", "project:p4", "task:4"}
+    assert set(cache._refs) == {"key-3", "key-4"}
+
+
+def test_expired_keys_leave_the_index():
+    cache = AnalysisCache(maxsize=10, ttl=0.05)
+    cache.set("old", {}, project_id="p1")
+    time.sleep(0.1)
+    cache.set("new", {}, project_id="p2")
+
+    assert set(cache._index) == {"project:p2"}
+    assert set(cache._refs) == {"new"}
+
+
+def test_invalidation_unindexes_every_ref_of_a_key():
+    cache = AnalysisCache(maxsize=10, ttl=60)
+    cache.set("key", {}, project_id="p1", task_id=7)
+
+    cache.invalidate_project("p1")
+
+    assert cache.get("key") is None
+    assert cache._index == {}
+    assert cache._refs == {}
@@ -0,0 +1,17 @@
+from fastapi.routing import APIRoute
+
+from main import app, mcp
+from llm.routes.routes_v1 import router as mcp_http_router
+
+
+def test_llm_routes_are_mcp_tools():
+    """FastApiMCP only sees routes included before it is built"""
+    tool_names = {tool.name for tool in mcp.tools}
+    llm_routes = {
+        route.operation_id or route.unique_id
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path.startswith(mcp_http_router.prefix)
+    }
+
+    assert llm_routes
+    assert llm_routes <= tool_names, f"not exposed over MCP: {sorted(llm_routes - tool_names)}"
@@ -0,0 +1,178 @@
+"""
+The MCP analysis routes run on the async engine and await the LLM, so the
+event loop keeps serving other requests while they wait. A ticker task
+measures how late it wakes up while each route runs against a stubbed Qwen
+service and AsyncSession.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from llm.routes import routes_v1
+from llm.services import analysis_service
+from llm.services.analysis_cache import analysis_cache
+from projects.models.models_v1 import Project, Task
+from projects.utils.enum import Status
+
+TICK_SECONDS = 0.005
+# simulated DB and LLM round trip
+IO_SECONDS = 0.02
+MAX_LAG_SECONDS = 0.05
+
+
+class StubQwenService:
+    model = "stub-model"
+
+    def model_for(self, operation, data):
+        return self.model
+
+    def fast_answer(self, kind, data):
+        return None
+
+    async def calculate_project_status(self, project_data):
+        await asyncio.sleep(IO_SECONDS)
+        return self._answer()
+
+    async def calculate_task_status_from_subtask(self, task_data):
+        await asyncio.sleep(IO_SECONDS)
+        return self._answer()
+
+    def fallback_project_status(self, project_data):
+        return {**self._answer(), "source": "fallback", "fallback": True}
+
+    def fallback_task_status(self, task_data):
+        return {**self._answer(), "source": "fallback", "fallback": True}
+
+    def _answer(self):
+        return {
+            "recommended_status": "in_progress",
+            "confidence": 0.9,
+            "reasoning": "stub",
+            "completion_percentage": 50,
+            "source": "llm",
+            "model": self.model
+        }
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeAsyncSession:
+    """Answers the routes' queries from one in-memory project, every round trip awaits"""
+
+    def __init__(self, project):
+        self.project = project
+
+    async def execute(self, statement):
+        await asyncio.sleep(IO_SECONDS)
+        entity = statement.column_descriptions[0]["entity"]
+        if entity is Project:
+            return FakeResult(self.project)
+        if entity is Task:
+            return FakeResult(self.project.tasks[0])
+        # no stored llm_reports analysis
+        return FakeResult(None)
+
+    async def get(self, model, ident):
+        await asyncio.sleep(IO_SECONDS)
+        return self.project if model is Project else None
+
+    def add(self, instance):
+        pass
+
+    async def commit(self):
+        await asyncio.sleep(IO_SECONDS)
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def make_project(task_count=200, subtask_count=5):
+    statuses = list(Status)
+    tasks = [
+        SimpleNamespace(
+            id=i,
+            title=f"Task {i}",
+            status=statuses[i % len(statuses)],
+            deadline=None,
+            subtasks=[
+                SimpleNamespace(id=i * 100 + j, title=f"Subtask {j}", status=statuses[j % len(statuses)])
+                for j in range(subtask_count)
+            ]
+        )
+        for i in range(task_count)
+    ]
+    return SimpleNamespace(
+        id=uuid4(),
+        name="Event loop",
+        description="",
+        status=Status.in_progress,
+        deadline=None,
+        tasks=tasks
+    )
+
+
+async def max_loop_lag(work):
+    """Run `work` and return the longest the event loop was late for a tick"""
+    lags = []
+
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        result = await work
+    finally:
+        task.cancel()
+    assert lags, "the route finished without yielding to the event loop"
+    return result, max(lags)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    project = make_project()
+    session = FakeAsyncSession(project)
+    monkeypatch.setattr(analysis_service, "qwen_service", StubQwenService())
+    # stored analyses are read and written on their own sessions
+    monkeypatch.setattr(analysis_service, "AsyncSessionLocal", lambda: session)
+    analysis_cache.clear()
+    yield session
+    analysis_cache.clear()
+
+
+@pytest.mark.parametrize("route", [
+    lambda session, user: routes_v1.analyze_project_status(str(session.project.id), session, user),
+    lambda session, user: routes_v1.analyze_task_status(session.project.tasks[0].id, session, user),
+    lambda session, user: routes_v1.calculate_project_completion(str(session.project.id), session),
+    lambda session, user: routes_v1.update_project_status_intelligent(str(session.project.id), session, user),
+], ids=[
+    "analyze_project_status",
+    "analyze_task_status",
+    "calculate_project_completion",
+    "update_project_status_intelligent",
+])
+def test_route_does_not_block_event_loop(session, route):
+    user = SimpleNamespace(id=uuid4())
+
+    result, lag = asyncio.run(max_loop_lag(route(session, user)))
+
+    assert result
+    assert lag < MAX_LAG_SECONDS, f"event loop blocked for {lag * 1000:.1f} ms"